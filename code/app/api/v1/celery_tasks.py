@@ -32,6 +32,24 @@ def upload_image_from_url(self, *args, **kwargs):
         logging.error(f"Celery task 'upload_image_from_url' error: {e}")
         raise self.retry(exc=e, countdown=5)
 
+
+@celery.task(name="tasks.flush_lesson_progress", ignore_result=True)
+def flush_lesson_progress():
+    from api.v1.course.progress_buffer import flush_progress
+    return flush_progress()
+
+
+@celery.task(bind=True, name="tasks.regrade_quiz")
+def regrade_quiz(self, quiz_block_id: int):
+    try:
+        from api.v1.course.quiz import regrade_quiz as regrade
+        from db.session import engine
+        with engine.begin() as connection:
+            return regrade(connection, quiz_block_id)
+    except Exception as e:
+        logging.error(f"Celery task 'regrade_quiz' error: {e}")
+        raise self.retry(exc=e, countdown=5)
+
 # celery_app = Celery(
 #     "app/api/v1/tasks",
 #     broker=f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/0",
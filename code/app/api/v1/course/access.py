@@ -0,0 +1,137 @@
+import itertools
+from typing import Iterable, Optional
+from uuid import UUID
+
+from sqlalchemy import and_, event, exists, or_, select, true
+from sqlalchemy.orm import Session
+
+from api.v1.models import (Course, CourseGroup, CourseLesson, CourseModule, LinkCourseGroupStudent,
+                           LinkOrganizationAllowedCourse, LinkUserAllowedCourse, LinkUserAllowedCourseLesson,
+                           LinkUserAllowedCourseModule, User)
+from core.config import settings
+from utils.cache import LRUCache
+
+
+class CourseAccess:
+    """ Access decision of one user for every active lesson of a course """
+
+    def __init__(self, course_granted: bool, lessons: dict[int, bool]):
+        self.course_granted = course_granted
+        self.lessons = lessons
+
+    @property
+    def accessible_lessons(self) -> frozenset[int]:
+        return frozenset(lesson_id for lesson_id, allowed in self.lessons.items() if allowed)
+
+    def can_open(self, course_lesson_id: int) -> bool:
+        return self.lessons.get(course_lesson_id, False)
+
+
+# (user_id, course_id) -> CourseAccess
+access_cache = LRUCache(maxsize=settings.access_cache_size, ttl=settings.access_cache_ttl)
+
+
+def course_access_stmt(user_id: UUID, course_id: int):
+    """ (course_lesson_id, course_granted, allowed) of every active lesson, one query.
+
+    The course grants are uncorrelated EXISTS evaluated once in a one row subquery, module and lesson grants
+    are LEFT JOINs.
+    """
+    grants = select(or_(
+        exists().where(LinkUserAllowedCourse.user_id == user_id, LinkUserAllowedCourse.course_id == course_id),
+        exists().where(LinkOrganizationAllowedCourse.course_id == course_id,
+                       LinkOrganizationAllowedCourse.organization_id == User.organization_id, User.id == user_id),
+        exists().where(LinkCourseGroupStudent.course_group_id == CourseGroup.id, CourseGroup.course_id == course_id,
+                       LinkCourseGroupStudent.student_id == user_id),
+    ).label('course_granted')).subquery('grants')
+    allowed = or_(
+        grants.c.course_granted,
+        Course.is_free == true(),
+        CourseModule.is_free == true(),
+        CourseLesson.is_free == true(),
+        LinkUserAllowedCourseModule.id.is_not(None),
+        LinkUserAllowedCourseLesson.id.is_not(None),
+    ).label('allowed')
+    return select(CourseLesson.id, grants.c.course_granted, allowed) \
+        .select_from(CourseLesson) \
+        .join(CourseModule, CourseModule.id == CourseLesson.course_module_id) \
+        .join(Course, Course.id == CourseModule.course_id) \
+        .join(grants, true()) \
+        .outerjoin(LinkUserAllowedCourseModule, and_(LinkUserAllowedCourseModule.course_module_id == CourseModule.id,
+                                                     LinkUserAllowedCourseModule.user_id == user_id)) \
+        .outerjoin(LinkUserAllowedCourseLesson, and_(LinkUserAllowedCourseLesson.course_lesson_id == CourseLesson.id,
+                                                     LinkUserAllowedCourseLesson.user_id == user_id)) \
+        .where(Course.id == course_id, CourseModule.is_active == true(), CourseLesson.is_active == true())
+
+
+def get_course_access(db_session: Session, user_id: UUID, course_id: int) -> CourseAccess:
+    def load():
+        rows = db_session.execute(course_access_stmt(user_id, course_id)).all()
+        course_granted = bool(rows) and bool(rows[0].course_granted)
+        return CourseAccess(course_granted, {row.id: bool(row.allowed) for row in rows})
+
+    return access_cache.get_or_set((str(user_id), course_id), load)
+
+
+def accessible_lessons(db_session: Session, user_id: UUID, course_id: int) -> frozenset[int]:
+    """ Ids of the lessons of the course the user can open, for outline pages """
+    return get_course_access(db_session, user_id, course_id).accessible_lessons
+
+
+def can_open_lesson(db_session: Session, user_id: UUID, course_lesson_id: int) -> bool:
+    course_id = db_session.execute(
+        select(CourseModule.course_id).join(CourseLesson, CourseLesson.course_module_id == CourseModule.id)
+        .where(CourseLesson.id == course_lesson_id)).scalar()
+    if course_id is None:
+        return False
+    return get_course_access(db_session, user_id, course_id).can_open(course_lesson_id)
+
+
+def invalidate_access(user_ids: Optional[Iterable] = None, course_ids: Optional[Iterable[int]] = None):
+    """ Drops cached decisions, e.g. after grants were written with Core statements """
+    user_ids = {str(user_id) for user_id in user_ids or ()}
+    course_ids = set(course_ids or ())
+    access_cache.invalidate(lambda key: key[0] in user_ids or key[1] in course_ids)
+
+
+def mark_access_changed(session: Session, user_ids: Iterable = (), course_ids: Iterable[int] = ()):
+    """ Drop the decisions of the users and courses after the session commits, for Core writes """
+    changed_users, changed_courses = session.info.setdefault('access_changed', (set(), set()))
+    changed_users.update(user_ids)
+    changed_courses.update(course_ids)
+
+
+def _changed_keys(session, obj) -> tuple[set, set]:
+    """ (user ids, course ids) whose decisions may depend on the changed object """
+    if isinstance(obj, (User, LinkUserAllowedCourseModule, LinkUserAllowedCourseLesson)):
+        return {obj.id if isinstance(obj, User) else obj.user_id}, set()
+    if isinstance(obj, LinkCourseGroupStudent):
+        return {obj.student_id}, set()
+    if isinstance(obj, LinkUserAllowedCourse):
+        return {obj.user_id}, {obj.course_id}
+    if isinstance(obj, (Course, LinkOrganizationAllowedCourse, CourseGroup, CourseModule)):
+        return set(), {obj.id if isinstance(obj, Course) else obj.course_id}
+    if isinstance(obj, CourseLesson):
+        module = session.get(CourseModule, obj.course_module_id) if obj.course_module_id is not None else None
+        return set(), {module.course_id} if module is not None else set()
+    return set(), set()
+
+
+@event.listens_for(Session, 'after_flush')
+def access_after_flush_event(session, flush_context):
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        users, courses = _changed_keys(session, obj)
+        if users or courses:
+            mark_access_changed(session, users, courses)
+
+
+@event.listens_for(Session, 'after_commit')
+def access_after_commit_event(session):
+    changed = session.info.pop('access_changed', None)
+    if changed:
+        invalidate_access(*changed)
+
+
+@event.listens_for(Session, 'after_rollback')
+def access_after_rollback_event(session):
+    session.info.pop('access_changed', None)
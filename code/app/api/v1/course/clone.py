@@ -0,0 +1,86 @@
+from typing import Optional
+from uuid import UUID
+
+import sqlalchemy as db
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.orm import Session
+
+from api.v1.course.tree import COURSE_TREE
+from api.v1.exceptions import IdOrSlugNotFoundException
+from api.v1.models import Course, refresh_course_stats
+from api.v1.models.catalogue_model import mark_catalogue_changed
+from core.babel_config import _
+
+
+def _id_map(node) -> db.Table:
+    """ Temporary old id -> new id table of one node, new ids are taken from the table sequence """
+    return db.Table(
+        f'clone_map_{node.name}', db.MetaData(),
+        db.Column('old_id', db.Integer, primary_key=True),
+        db.Column('new_id', db.Integer, nullable=False),
+        prefixes=['TEMPORARY'], postgresql_on_commit='DROP',
+    )
+
+
+def clone_course(db_session: Session, course_id: int, organization_id: Optional[UUID] = None,
+                 created_by_id: Optional[UUID] = None) -> int:
+    """ Deep copy of a course (see COURSE_TREE) with two set based statements per table:
+
+    INSERT INTO clone_map_x SELECT id, nextval(...) FROM x WHERE <belongs to the copied tree>
+    INSERT INTO x SELECT map.new_id, ... FROM x JOIN clone_map_x map ... JOIN clone_map_<parent> ...
+
+    Runs in the session transaction without flushing ORM objects. Copied slugs get the new id appended.
+    Returns id of the new course.
+    """
+    connection = db_session.connection()
+    if connection.execute(select(Course.id).where(Course.id == course_id)).scalar() is None:
+        raise IdOrSlugNotFoundException(_('Course not found'))
+
+    maps = {}
+    for node in COURSE_TREE:
+        source = node.table
+        id_map = maps[node.model] = _id_map(node)
+        id_map.create(connection)
+
+        if node.model is Course:
+            ids = select(source.c.id).where(source.c.id == course_id)
+        else:
+            ids = node.ids_stmt(lambda model: select(maps[model].c.old_id))
+        sequence = func.pg_get_serial_sequence(node.name, 'id')
+        connection.execute(id_map.insert().from_select(
+            ['old_id', 'new_id'], select(source.c.id, func.nextval(sequence)).where(source.c.id.in_(ids))))
+
+        joined = source.join(id_map, id_map.c.old_id == source.c.id)
+        remapped = dict(node.refs)
+        if node.parent is not None:
+            column, parent_model = node.parent
+            remapped[column] = parent_model
+        values = {}
+        for column, model in remapped.items():
+            parent_map = maps[model].alias(f'{maps[model].name}_{column}')
+            joined = joined.join(parent_map, parent_map.c.old_id == source.c[column])
+            values[column] = parent_map.c.new_id
+        if node.has_slug:
+            values['slug'] = source.c.slug + '-' + db.cast(id_map.c.new_id, db.String)
+        if created_by_id is not None and 'created_by_id' in source.c:
+            values['created_by_id'] = literal(created_by_id, PG_UUID)
+        if organization_id is not None and node.model is Course:
+            values['organization_id'] = literal(organization_id, PG_UUID)
+        if 'created_at' in source.c:
+            values['created_at'] = func.timezone('utc', func.now())
+
+        columns = [column for column in node.copied_columns if column not in values]
+        connection.execute(source.insert().from_select(
+            ['id', *values, *columns],
+            select(id_map.c.new_id, *values.values(), *(source.c[column] for column in columns))
+            .select_from(joined)))
+
+    new_course_id = connection.execute(select(maps[Course].c.new_id)).scalar_one()
+    refresh_course_stats(connection, [new_course_id])
+    # dropped on success so another clone can run in the same transaction, a failed one is rolled back with them
+    for id_map in maps.values():
+        id_map.drop(connection)
+    # Core statements bypass the flush listeners
+    mark_catalogue_changed(db_session)
+    return new_course_id
@@ -0,0 +1,146 @@
+import csv
+import enum
+import io
+import re
+import uuid
+from typing import Iterable, Optional
+from uuid import UUID
+
+from sqlalchemy import Select, exists, func, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from api.v1.course.access import mark_access_changed
+from api.v1.exceptions import CustomValidationError, IdOrSlugNotFoundException
+from api.v1.models import (Course, CourseGroup, CourseLesson, CourseModule, LinkCourseGroupStudent,
+                           LinkUserAllowedCourse, LinkUserAllowedCourseLesson, LinkUserAllowedCourseModule, User)
+from core.babel_config import _
+
+# target -> (target model, link model, link column)
+ENROLLMENT_TARGETS = {
+    'course': (Course, LinkUserAllowedCourse, 'course_id'),
+    'course_module': (CourseModule, LinkUserAllowedCourseModule, 'course_module_id'),
+    'course_lesson': (CourseLesson, LinkUserAllowedCourseLesson, 'course_lesson_id'),
+}
+CSV_HEADERS = {'id', 'user_id', 'phone', 'email', 'user'}
+
+
+class EnrollmentStatusEnum(str, enum.Enum):
+    ENROLLED = 'enrolled'
+    ALREADY_ENROLLED = 'already_enrolled'
+    NOT_FOUND = 'not_found'
+    AMBIGUOUS = 'ambiguous'
+    DUPLICATE = 'duplicate'
+
+
+def read_identifiers_csv(content) -> list[str]:
+    """ First non-empty cell of every row of an uploaded CSV (bytes or text), a header row is skipped """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    identifiers = []
+    for row in csv.reader(io.StringIO(content)):
+        value = next((cell.strip() for cell in row if cell.strip()), None)
+        if value and not (not identifiers and value.lower() in CSV_HEADERS):
+            identifiers.append(value)
+    return identifiers
+
+
+def _lookup_key(identifier: str) -> tuple[str, str]:
+    """ ('id' | 'email' | 'phone', normalized value) """
+    try:
+        return 'id', str(uuid.UUID(identifier))
+    except ValueError:
+        pass
+    if '@' in identifier:
+        return 'email', identifier.lower()
+    # phones are stored as digits only (998XXXXXXXXX)
+    return 'phone', re.sub(r'\D', '', identifier)
+
+
+def resolve_users(db_session: Session, identifiers: Iterable[str],
+                  organization_id: Optional[UUID] = None) -> dict[tuple[str, str], list[UUID]]:
+    """ Lookup key -> ids of the matching users, every identifier is resolved with one query """
+    keys = {_lookup_key(identifier) for identifier in identifiers}
+    values = {kind: [value for key_kind, value in keys if key_kind == kind and value]
+              for kind in ('id', 'email', 'phone')}
+    values['id'] = [uuid.UUID(value) for value in values['id']]
+    columns = {'id': User.id, 'email': func.lower(User.email), 'phone': User.phone}
+    filters = [columns[kind].in_(items) for kind, items in values.items() if items]
+    if not filters:
+        return {}
+    stmt = select(User.id, User.email, User.phone).where(or_(*filters), User.deleted_at.is_(None))
+    if organization_id is not None:
+        stmt = stmt.where(User.organization_id == organization_id)
+    result = {}
+    for user_id, email, phone in db_session.execute(stmt):
+        for key in (('id', str(user_id)), ('email', (email or '').lower()), ('phone', phone)):
+            if key in keys:
+                result.setdefault(key, []).append(user_id)
+    return result
+
+
+def enroll_users(db_session: Session, identifiers: list[str], target: str, target_id: int,
+                 organization_id: Optional[UUID] = None, batch_size: int = 1000) -> list[dict]:
+    """ Grants access to a course, module or lesson (see ENROLLMENT_TARGETS) to users given by id, email or phone.
+
+    Existing grants are kept (INSERT ... ON CONFLICT DO NOTHING), nothing is loaded through the allowed_users
+    collections. Returns an outcome per identifier: {"identifier", "user_id", "status"}.
+    """
+    if target not in ENROLLMENT_TARGETS:
+        raise CustomValidationError(_('Unknown enrollment target'))
+    target_model, link_model, link_column = ENROLLMENT_TARGETS[target]
+    if db_session.execute(select(target_model.id).where(target_model.id == target_id)).scalar() is None:
+        raise IdOrSlugNotFoundException(_('Enrollment target not found'))
+
+    users = resolve_users(db_session, identifiers, organization_id)
+    outcomes, pending, seen = [], {}, set()
+    for identifier in identifiers:
+        user_ids = users.get(_lookup_key(identifier), [])
+        outcome = {"identifier": identifier, "user_id": None, "status": EnrollmentStatusEnum.NOT_FOUND}
+        if len(user_ids) > 1:
+            outcome["status"] = EnrollmentStatusEnum.AMBIGUOUS
+        elif user_ids:
+            outcome["user_id"] = user_ids[0]
+            if user_ids[0] in seen:
+                outcome["status"] = EnrollmentStatusEnum.DUPLICATE
+            else:
+                seen.add(user_ids[0])
+                pending[user_ids[0]] = outcome
+        outcomes.append(outcome)
+
+    table = link_model.__table__
+    user_ids = list(pending)
+    for start in range(0, len(user_ids), batch_size):
+        rows = [{"user_id": user_id, link_column: target_id} for user_id in user_ids[start:start + batch_size]]
+        stmt = pg_insert(table).values(rows) \
+            .on_conflict_do_nothing(index_elements=[table.c.user_id, table.c[link_column]]) \
+            .returning(table.c.user_id)
+        inserted = {str(user_id) for user_id in db_session.connection().execute(stmt).scalars()}
+        for user_id in user_ids[start:start + batch_size]:
+            enrolled = str(user_id) in inserted
+            pending[user_id]["status"] = EnrollmentStatusEnum.ENROLLED if enrolled \
+                else EnrollmentStatusEnum.ALREADY_ENROLLED
+
+    # Core inserts bypass the flush listeners
+    mark_access_changed(db_session, user_ids=user_ids)
+    return outcomes
+
+
+# Course user lists are filtered with EXISTS so every user is one row, they page with
+# paginate_keyset(db_session, stmt, User.id) into ACourse*CursorListResponseSchema
+
+
+def course_students_stmt(course_id: int) -> Select:
+    return select(User).where(exists().where(
+        LinkCourseGroupStudent.student_id == User.id,
+        LinkCourseGroupStudent.course_group_id == CourseGroup.id,
+        CourseGroup.course_id == course_id))
+
+
+def course_curators_stmt(course_id: int) -> Select:
+    return select(User).where(exists().where(CourseGroup.curator_id == User.id, CourseGroup.course_id == course_id))
+
+
+def course_allowed_users_stmt(course_id: int) -> Select:
+    return select(User).where(exists().where(
+        LinkUserAllowedCourse.user_id == User.id, LinkUserAllowedCourse.course_id == course_id))
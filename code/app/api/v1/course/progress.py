@@ -0,0 +1,125 @@
+from typing import Iterable, Optional
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from api.v1.exceptions import CustomValidationError, IdOrSlugNotFoundException
+from api.v1.models import CourseLesson, CourseModule, CourseStats, UserCourseProgress
+from core.babel_config import _
+from core.config import settings
+from utils.cache import LRUCache
+
+# course_lesson_id -> (course_id, ordinal)
+lesson_position_cache = LRUCache(maxsize=settings.lesson_position_cache_size,
+                                 ttl=settings.lesson_position_cache_ttl)
+
+
+def lesson_positions(connection, course_lesson_ids: Iterable[int]) -> dict[int, tuple[int, int]]:
+    """ (course_id, ordinal) of the lessons, lessons without an ordinal are left out """
+    result, missing = {}, []
+    for course_lesson_id in set(course_lesson_ids):
+        position = lesson_position_cache.get(course_lesson_id)
+        if position is None:
+            missing.append(course_lesson_id)
+        else:
+            result[course_lesson_id] = position
+    if missing:
+        stmt = select(CourseLesson.id, CourseModule.course_id, CourseLesson.ordinal) \
+            .join(CourseModule, CourseModule.id == CourseLesson.course_module_id) \
+            .where(CourseLesson.id.in_(missing), CourseLesson.ordinal.is_not(None))
+        for course_lesson_id, course_id, ordinal in connection.execute(stmt):
+            result[course_lesson_id] = (course_id, ordinal)
+            lesson_position_cache.set(course_lesson_id, (course_id, ordinal))
+    return result
+
+
+def progress_rows(entries: Iterable[tuple[UUID, int, float]], positions: dict[int, tuple[int, int]]) -> list[dict]:
+    """ Folds (user_id, course_lesson_id, learned_percent) entries into one row per (user, course) """
+    rows = {}
+    for user_id, course_lesson_id, learned_percent in entries:
+        position = positions.get(course_lesson_id)
+        if position is None:
+            continue
+        course_id, ordinal = position
+        row = rows.setdefault((str(user_id), course_id), {
+            'user_id': str(user_id), 'course_id': course_id, 'learned': bytearray(), 'percents': []})
+        percent = round(learned_percent)
+        if len(row['percents']) <= ordinal:
+            row['percents'].extend([None] * (ordinal + 1 - len(row['percents'])))
+        row['percents'][ordinal] = max(row['percents'][ordinal] or 0, percent)
+        if learned_percent >= settings.progress_learned_percent:
+            if len(row['learned']) <= ordinal >> 3:
+                row['learned'].extend(bytes((ordinal >> 3) + 1 - len(row['learned'])))
+            row['learned'][ordinal >> 3] |= 1 << (ordinal & 7)
+    for row in rows.values():
+        row['learned'] = bytes(row['learned'])
+    return list(rows.values())
+
+
+def progress_merge_stmt(rows: list[dict]):
+    """ Upsert which ORs the bitmaps and keeps the higher percents, progress never goes back """
+    table = UserCourseProgress.__table__
+    stmt = pg_insert(table).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.course_id],
+        set_={
+            'learned': func.progress_bitmap_or(table.c.learned, stmt.excluded.learned),
+            'percents': func.progress_percents_max(table.c.percents, stmt.excluded.percents),
+            'updated_at': func.timezone('utc', func.now()),
+        },
+    )
+
+
+def merge_progress(connection, entries: list[tuple[UUID, int, float]]) -> int:
+    """ Applies (user_id, course_lesson_id, learned_percent) entries with one statement, returns number of rows """
+    rows = progress_rows(entries, lesson_positions(connection, [entry[1] for entry in entries]))
+    if rows:
+        connection.execute(progress_merge_stmt(rows))
+    return len(rows)
+
+
+def mark_lesson(db_session: Session, user_id: UUID, course_lesson_id: int, learned_percent: float) -> None:
+    if not 0 <= learned_percent <= 100:
+        raise CustomValidationError(_('Learned percent must be between 0 and 100'))
+    if not merge_progress(db_session.connection(), [(user_id, course_lesson_id, learned_percent)]):
+        raise IdOrSlugNotFoundException(_('Lesson not found'))
+
+
+def get_course_progress(db_session: Session, user_id: UUID, course_id: int) -> Optional[UserCourseProgress]:
+    stmt = select(UserCourseProgress).where(UserCourseProgress.user_id == user_id,
+                                            UserCourseProgress.course_id == course_id)
+    return db_session.execute(stmt).scalar()
+
+
+def lesson_progress(db_session: Session, user_id: UUID, course_id: int) -> dict[int, dict]:
+    """ {course_lesson_id: {"learned_percent", "is_learned"}} of every lesson of the course """
+    progress = get_course_progress(db_session, user_id, course_id)
+    stmt = select(CourseLesson.id, CourseLesson.ordinal) \
+        .join(CourseModule, CourseModule.id == CourseLesson.course_module_id) \
+        .where(CourseModule.course_id == course_id, CourseLesson.ordinal.is_not(None))
+    result = {}
+    for course_lesson_id, ordinal in db_session.execute(stmt):
+        result[course_lesson_id] = {
+            "learned_percent": progress.percent(ordinal) if progress else 0,
+            "is_learned": progress.is_learned(ordinal) if progress else False,
+        }
+    return result
+
+
+def course_progress_summary(db_session: Session, course_id: int) -> dict:
+    """ Learners, completed learners and average completion percent of the course, computed over the bitmaps """
+    learned = func.bit_count(UserCourseProgress.learned)
+    total_lessons = select(CourseStats.total_lessons).where(CourseStats.course_id == course_id).scalar_subquery()
+    stmt = select(
+        func.count(),
+        func.count().filter(learned >= total_lessons),
+        func.avg(100.0 * learned / func.nullif(total_lessons, 0)),
+    ).where(UserCourseProgress.course_id == course_id)
+    learners, completed, average = db_session.execute(stmt).one()
+    return {
+        "learners": learners,
+        "completed": completed,
+        "average_percent": round(float(average or 0), 2),
+    }
@@ -0,0 +1,155 @@
+import logging
+from typing import Iterable, Optional
+from uuid import UUID
+
+import redis
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from api.v1.course.progress import merge_progress
+from api.v1.exceptions import CustomValidationError
+from api.v1.models import UserLearnedCourseLesson
+from core.babel_config import _
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+BUFFER_KEY = 'lesson_progress:buffer'
+FLUSHING_KEY = 'lesson_progress:flushing'
+FLUSH_LOCK_KEY = 'lesson_progress:flush_lock'
+
+# Keeps the highest percent of every (user, lesson) field, so heartbeats may arrive in any order
+_MAX_MERGE_SCRIPT = """
+local current = tonumber(redis.call('HGET', KEYS[1], ARGV[1]))
+local percent = tonumber(ARGV[2])
+if current == nil or current < percent then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+end
+return 1
+"""
+
+_redis_client: Optional[redis.Redis] = None
+_max_merge = None
+
+
+def get_redis() -> redis.Redis:
+    global _redis_client, _max_merge
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.redis_url, decode_responses=True)
+        _max_merge = _redis_client.register_script(_MAX_MERGE_SCRIPT)
+    return _redis_client
+
+
+def _field(user_id: UUID, course_lesson_id: int) -> str:
+    return f"{user_id}:{course_lesson_id}"
+
+
+def record_progress(user_id: UUID, course_lesson_id: int, learned_percent: float) -> None:
+    """ Buffers a progress heartbeat, it reaches the database on the next flush_progress() """
+    if not 0 <= learned_percent <= 100:
+        raise CustomValidationError(_('Learned percent must be between 0 and 100'))
+    get_redis()
+    _max_merge(keys=[BUFFER_KEY], args=[_field(user_id, course_lesson_id), learned_percent])
+
+
+def buffered_progress(user_id: UUID, course_lesson_ids: Iterable[int]) -> dict[int, float]:
+    """ Progress not flushed yet, to be merged (max) with the stored UserLearnedCourseLesson rows """
+    course_lesson_ids = list(course_lesson_ids)
+    if not course_lesson_ids:
+        return {}
+    client = get_redis()
+    fields = [_field(user_id, course_lesson_id) for course_lesson_id in course_lesson_ids]
+    with client.pipeline(transaction=False) as pipeline:
+        pipeline.hmget(BUFFER_KEY, fields)
+        pipeline.hmget(FLUSHING_KEY, fields)
+        buffered, flushing = pipeline.execute()
+    result = {}
+    for course_lesson_id, *values in zip(course_lesson_ids, buffered, flushing):
+        values = [float(value) for value in values if value is not None]
+        if values:
+            result[course_lesson_id] = max(values)
+    return result
+
+
+def progress_upsert_stmt(rows: list[dict]):
+    """ Never lowers stored progress, so a batch may be applied more than once """
+    table = UserLearnedCourseLesson.__table__
+    stmt = pg_insert(table).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.course_lesson_id],
+        set_={
+            'learned_percent': func.greatest(table.c.learned_percent, stmt.excluded.learned_percent),
+            'is_learned': table.c.is_learned.is_(True) | stmt.excluded.is_learned,
+            'updated_at': func.timezone('utc', func.now()),
+        },
+    )
+
+
+def _rows(items: list[tuple[str, str]]) -> list[dict]:
+    rows = []
+    for field, value in items:
+        user_id, course_lesson_id = field.rsplit(':', 1)
+        percent = float(value)
+        rows.append({
+            'user_id': user_id,
+            'course_lesson_id': int(course_lesson_id),
+            'learned_percent': percent,
+            'is_learned': percent >= settings.progress_learned_percent,
+        })
+    return rows
+
+
+def _flush_batch(connection, batch: list[tuple[str, str]]):
+    rows = _rows(batch)
+    connection.execute(progress_upsert_stmt(rows))
+    merge_progress(connection, [(row['user_id'], row['course_lesson_id'], row['learned_percent']) for row in rows])
+
+
+def flush_progress(batch_size: Optional[int] = None) -> int:
+    """ Moves the buffer to the database, returns number of flushed (user, lesson) pairs.
+
+    The buffer is renamed first, new heartbeats go to a fresh buffer meanwhile. The renamed hash is deleted
+    only after the commit, so a crashed flush is retried by the next call (upserts are idempotent).
+    """
+    client = get_redis()
+    lock = client.lock(FLUSH_LOCK_KEY, timeout=max(60.0, settings.progress_flush_interval * 6))
+    if not lock.acquire(blocking=False):
+        return 0  # another worker is flushing
+    try:
+        return _flush(client, batch_size or settings.progress_flush_batch_size)
+    finally:
+        try:
+            lock.release()
+        except redis.exceptions.LockNotOwnedError as e:
+            # the flush outlived the lock timeout, the flushed rows are committed anyway
+            logger.warning(f"Progress flush lock expired before release: {e}")
+
+
+def _flush(client: redis.Redis, batch_size: int) -> int:
+    from db.session import engine
+
+    if not client.exists(FLUSHING_KEY):
+        try:
+            client.rename(BUFFER_KEY, FLUSHING_KEY)
+        except redis.ResponseError:
+            return 0  # nothing buffered
+
+    flushed = 0
+    with engine.begin() as connection:
+        # HSCAN may return a field twice, a repeated row would fail ON CONFLICT DO UPDATE
+        seen, batch = set(), []
+        for field, value in client.hscan_iter(FLUSHING_KEY, count=batch_size):
+            if field in seen:
+                continue
+            seen.add(field)
+            batch.append((field, value))
+            if len(batch) >= batch_size:
+                _flush_batch(connection, batch)
+                flushed += len(batch)
+                batch = []
+        if batch:
+            _flush_batch(connection, batch)
+            flushed += len(batch)
+    client.delete(FLUSHING_KEY)
+    logger.info("Flushed %s lesson progress updates", flushed)
+    return flushed
@@ -0,0 +1,195 @@
+import datetime
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import and_, bindparam, func, select, true, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from api.v1.exceptions import CustomValidationError, IdOrSlugNotFoundException
+from api.v1.models import Answer, LinkQuizBlockQuestion, Question, QuestionTypeEnum, QuizAttempt, QuizBlock
+from core.babel_config import _
+from core.config import settings
+
+GRADED_TYPES = (QuestionTypeEnum.SINGLE, QuestionTypeEnum.MULTIPLE)
+START_ATTEMPT_RETRIES = 3
+
+
+class QuizAnswerKey:
+    """ Correct options of every question of a quiz as a bitmask over its active answers in (sort, id) order,
+    an attempt answer is correct when the mask of the chosen options equals the key mask """
+
+    def __init__(self, rows):
+        self.types = {}
+        self.positions = {}
+        self.correct = {}
+        for question_id, question_type, answer_id, is_correct in rows:
+            self.types[question_id] = question_type
+            positions = self.positions.setdefault(question_id, {})
+            if answer_id is None or answer_id in positions:
+                continue
+            bit = 1 << len(positions)
+            positions[answer_id] = bit
+            if is_correct:
+                self.correct[question_id] = self.correct.get(question_id, 0) | bit
+        # questions without a correct option can not be answered right and are not graded
+        self.graded = [question_id for question_id, question_type in self.types.items()
+                       if question_type in GRADED_TYPES and self.correct.get(question_id)]
+
+    def mask(self, question_id: int, answer_ids) -> Optional[int]:
+        """ Bitmask of the chosen options, None when an option is not an active answer of the question """
+        positions = self.positions.get(question_id, {})
+        mask = 0
+        for answer_id in answer_ids:
+            bit = positions.get(answer_id)
+            if bit is None:
+                return None
+            mask |= bit
+        return mask
+
+    def is_correct(self, question_id: int, answer_ids) -> bool:
+        if not isinstance(answer_ids, list):
+            return False
+        mask = self.mask(question_id, answer_ids)
+        if mask is None:
+            return False
+        if self.types[question_id] == QuestionTypeEnum.SINGLE and mask & (mask - 1):
+            return False  # more than one option chosen
+        return mask == self.correct[question_id]
+
+    def grade(self, answers: dict) -> tuple[int, int]:
+        """ (correct_count, errors_count), unanswered questions are errors """
+        correct = sum(1 for question_id in self.graded if self.is_correct(question_id, answers.get(str(question_id))))
+        return correct, len(self.graded) - correct
+
+    def normalize(self, answers: dict) -> dict:
+        """ Answers of the quiz questions only, option ids deduplicated and sorted """
+        result = {}
+        for question_id, value in answers.items():
+            question_type = self.types.get(int(question_id))
+            if question_type is None or value is None:
+                continue
+            if question_type == QuestionTypeEnum.OWN_ANSWER:
+                result[str(question_id)] = str(value)
+            else:
+                result[str(question_id)] = sorted({int(answer_id) for answer_id in value})
+        return result
+
+
+def answer_key_stmt(quiz_block_id: int):
+    return select(Question.id, Question.type, Answer.id, Answer.is_correct) \
+        .join(LinkQuizBlockQuestion, LinkQuizBlockQuestion.question_id == Question.id) \
+        .outerjoin(Answer, and_(Answer.question_id == Question.id, Answer.is_active == true())) \
+        .where(LinkQuizBlockQuestion.quiz_block_id == quiz_block_id, Question.is_active == true()) \
+        .order_by(Question.id, Answer.sort, Answer.id)
+
+
+def load_answer_key(connection, quiz_block_id: int) -> QuizAnswerKey:
+    return QuizAnswerKey(connection.execute(answer_key_stmt(quiz_block_id)).all())
+
+
+def _deadline(quiz: QuizBlock, attempt: QuizAttempt) -> Optional[datetime.datetime]:
+    if not quiz.fixed_seconds:
+        return None
+    return attempt.started_at + datetime.timedelta(seconds=quiz.fixed_seconds + settings.quiz_time_grace_seconds)
+
+
+def _is_passed(errors_count: int, allowed_errors_count: Optional[int]) -> bool:
+    return errors_count <= (allowed_errors_count or 0)
+
+
+def _grade(attempt: QuizAttempt, key: QuizAnswerKey, quiz: QuizBlock):
+    attempt.correct_count, attempt.errors_count = key.grade(attempt.answers)
+    attempt.is_passed = _is_passed(attempt.errors_count, quiz.allowed_errors_count)
+    attempt.graded_at = datetime.datetime.utcnow()
+
+
+def start_attempt(db_session: Session, user_id: UUID, quiz_block_id: int) -> QuizAttempt:
+    """ Returns the running attempt or starts the next one within QuizBlock.allowed_attempts """
+    quiz = db_session.get(QuizBlock, quiz_block_id)
+    if quiz is None:
+        raise IdOrSlugNotFoundException(_('Quiz not found'))
+    stmt = select(QuizAttempt).where(QuizAttempt.user_id == user_id, QuizAttempt.quiz_block_id == quiz_block_id) \
+        .order_by(QuizAttempt.attempt_number.desc()).limit(1).with_for_update()
+    last = db_session.execute(stmt).scalar()
+    if last is not None and last.submitted_at is None:
+        deadline = _deadline(quiz, last)
+        if deadline is None or datetime.datetime.utcnow() <= deadline:
+            return last
+        # time is over, the attempt is closed with what was saved
+        last.submitted_at = deadline
+        _grade(last, load_answer_key(db_session.connection(), quiz_block_id), quiz)
+    attempts = last.attempt_number if last is not None else 0
+    if quiz.allowed_attempts and attempts >= quiz.allowed_attempts:
+        raise CustomValidationError(_('No attempts left'))
+    for _retry in range(START_ATTEMPT_RETRIES):
+        attempt = QuizAttempt(user_id=user_id, quiz_block_id=quiz_block_id, attempt_number=attempts + 1)
+        try:
+            with db_session.begin_nested():
+                db_session.add(attempt)
+            return attempt
+        except IntegrityError:
+            # a concurrent request started this attempt first (unique user, quiz, attempt_number),
+            # FOR UPDATE keeps the read on the primary, a replica may not have the row yet
+            stmt = select(QuizAttempt).where(QuizAttempt.user_id == user_id,
+                                             QuizAttempt.quiz_block_id == quiz_block_id,
+                                             QuizAttempt.attempt_number == attempts + 1).with_for_update()
+            existing = db_session.execute(stmt).scalar_one_or_none()
+            if existing is not None:
+                return existing
+    raise CustomValidationError(_('Quiz attempt could not be started, try again'))
+
+
+def submit_attempt(db_session: Session, user_id: UUID, attempt_id: int, answers: dict) -> QuizAttempt:
+    """ Stores and grades the answers {question_id: [answer_id, ...] | "own answer"} """
+    stmt = select(QuizAttempt).where(QuizAttempt.id == attempt_id, QuizAttempt.user_id == user_id).with_for_update()
+    attempt = db_session.execute(stmt).scalar()
+    if attempt is None:
+        raise IdOrSlugNotFoundException(_('Quiz attempt not found'))
+    if attempt.submitted_at is not None:
+        raise CustomValidationError(_('Quiz attempt is already submitted'))
+    quiz = db_session.get(QuizBlock, attempt.quiz_block_id)
+    now = datetime.datetime.utcnow()
+    deadline = _deadline(quiz, attempt)
+    if deadline is not None and now > deadline:
+        raise CustomValidationError(_('Time limit exceeded'))
+    key = load_answer_key(db_session.connection(), attempt.quiz_block_id)
+    try:
+        attempt.answers = key.normalize(answers)
+    except (TypeError, ValueError):
+        raise CustomValidationError(_('Invalid answers'))
+    attempt.submitted_at = now
+    _grade(attempt, key, quiz)
+    db_session.flush()
+    return attempt
+
+
+def regrade_quiz(connection, quiz_block_id: int, batch_size: int = 1000) -> int:
+    """ Grades every submitted attempt of the quiz against the current answer key, one key query and keyset
+    batches of attempts, changed grades are written with one executemany UPDATE per batch.
+    Returns number of updated attempts """
+    key = load_answer_key(connection, quiz_block_id)
+    allowed_errors_count = connection.execute(
+        select(QuizBlock.allowed_errors_count).where(QuizBlock.id == quiz_block_id)).scalar()
+    table = QuizAttempt.__table__
+    update_stmt = update(table).where(table.c.id == bindparam('attempt_id')).values(
+        correct_count=bindparam('correct'), errors_count=bindparam('errors'), is_passed=bindparam('passed'),
+        graded_at=func.timezone('utc', func.now()))
+    updated, last_id = 0, 0
+    while True:
+        stmt = select(table.c.id, table.c.answers, table.c.correct_count, table.c.errors_count, table.c.is_passed) \
+            .where(table.c.quiz_block_id == quiz_block_id, table.c.submitted_at.is_not(None), table.c.id > last_id) \
+            .order_by(table.c.id).limit(batch_size)
+        rows = connection.execute(stmt).all()
+        if not rows:
+            return updated
+        changes = []
+        for row in rows:
+            correct, errors = key.grade(row.answers)
+            passed = _is_passed(errors, allowed_errors_count)
+            if (correct, errors, passed) != (row.correct_count, row.errors_count, row.is_passed):
+                changes.append({'attempt_id': row.id, 'correct': correct, 'errors': errors, 'passed': passed})
+        if changes:
+            connection.execute(update_stmt, changes)
+            updated += len(changes)
+        last_id = rows[-1].id
@@ -0,0 +1,150 @@
+import itertools
+from typing import Optional
+
+from sqlalchemy import event, func, select, true, union_all
+from sqlalchemy.orm import Session
+
+from api.v1.exceptions import IdOrSlugNotFoundException
+from api.v1.helper.translation import language_preference, preferred_translation_stmt, supported_language
+from api.v1.models import (Answer, AnswerTranslation, LinkQuizBlockQuestion, Question, QuestionTranslation, QuizBlock,
+                           QuizBlockQuestionSort)
+from api.v1.schemas.site.course.quiz_schema import IQuizSchema
+from core.babel_config import _
+from core.config import settings
+from utils.cache import LRUCache
+
+# answer keys are left out of the student payload
+STUDENT_EXCLUDE = {'questions': {'__all__': {'answers': {'__all__': {'is_correct'}}}}}
+
+# (quiz_block_id, language code, with answer key) -> (version, serialized IQuizSchema)
+quiz_payload_cache = LRUCache(maxsize=settings.quiz_payload_cache_size)
+
+
+def quiz_version(db_session: Session, quiz_block_id: int) -> str:
+    """ Row count and last change of every row the payload is built from, changes with any edit or deletion """
+    question_ids = select(LinkQuizBlockQuestion.question_id).where(LinkQuizBlockQuestion.quiz_block_id == quiz_block_id)
+    answer_ids = select(Answer.id).where(Answer.question_id.in_(question_ids))
+
+    def stamps(model, *criteria):
+        return select(func.coalesce(model.updated_at, model.created_at).label('stamp')).where(*criteria)
+
+    rows = union_all(
+        stamps(QuizBlock, QuizBlock.id == quiz_block_id),
+        stamps(LinkQuizBlockQuestion, LinkQuizBlockQuestion.quiz_block_id == quiz_block_id),
+        stamps(QuizBlockQuestionSort, QuizBlockQuestionSort.quiz_block_id == quiz_block_id),
+        stamps(Question, Question.id.in_(question_ids)),
+        stamps(QuestionTranslation, QuestionTranslation.question_id.in_(question_ids)),
+        stamps(Answer, Answer.id.in_(answer_ids)),
+        stamps(AnswerTranslation, AnswerTranslation.answer_id.in_(answer_ids)),
+    ).subquery('stamps')
+    count, last_change = db_session.execute(select(func.count(), func.max(rows.c.stamp))).one()
+    return f"{count}:{last_change.isoformat() if last_change else ''}"
+
+
+def build_quiz(db_session: Session, quiz_block_id: int, language_code: Optional[str] = None) -> dict:
+    """ Quiz with its active questions and answers in one language, five queries whatever its size """
+    quiz = db_session.get(QuizBlock, quiz_block_id)
+    if quiz is None:
+        raise IdOrSlugNotFoundException(_('Quiz not found'))
+    language_ids = language_preference(db_session, language_code)
+    questions = db_session.execute(
+        select(Question.id, Question.type)
+        .join(LinkQuizBlockQuestion, LinkQuizBlockQuestion.question_id == Question.id)
+        .outerjoin(QuizBlockQuestionSort, (QuizBlockQuestionSort.question_id == Question.id)
+                   & (QuizBlockQuestionSort.quiz_block_id == quiz_block_id))
+        .where(LinkQuizBlockQuestion.quiz_block_id == quiz_block_id, Question.is_active == true())
+        .order_by(QuizBlockQuestionSort.sort.asc().nulls_last(), Question.id)).all()
+    question_ids = list(dict.fromkeys(question.id for question in questions))
+    answers = db_session.execute(
+        select(Answer.id, Answer.question_id, Answer.sort, Answer.is_correct)
+        .where(Answer.question_id.in_(question_ids), Answer.is_active == true())
+        .order_by(Answer.sort, Answer.id)).all() if question_ids else []
+    question_translations = {row.question_id: row for row in db_session.execute(
+        preferred_translation_stmt(QuestionTranslation, language_ids, question_ids)).scalars()} \
+        if question_ids else {}
+    answer_translations = {row.answer_id: row for row in db_session.execute(
+        preferred_translation_stmt(AnswerTranslation, language_ids, [answer.id for answer in answers])).scalars()} \
+        if answers else {}
+
+    answers_by_question = {}
+    for answer in answers:
+        translation = answer_translations.get(answer.id)
+        answers_by_question.setdefault(answer.question_id, []).append({
+            "id": answer.id,
+            "sort": answer.sort,
+            "title": translation.title if translation else None,
+            "is_correct": bool(answer.is_correct),
+        })
+    types = {question.id: question.type for question in questions}
+    result = []
+    for question_id in question_ids:
+        translation = question_translations.get(question_id)
+        result.append({
+            "id": question_id,
+            "type": types[question_id],
+            "title": translation.title if translation else None,
+            "content": translation.content if translation else None,
+            "answers": answers_by_question.get(question_id, []),
+        })
+    return {
+        "id": quiz.id,
+        "language": language_code,
+        "quiz_type": quiz.quiz_type,
+        "allowed_attempts": quiz.allowed_attempts,
+        "fixed_seconds": quiz.fixed_seconds,
+        "allowed_errors_count": quiz.allowed_errors_count,
+        "questions": result,
+    }
+
+
+def get_quiz_payload(db_session: Session, quiz_block_id: int, language_code: Optional[str] = None,
+                     with_answer_key: bool = False) -> bytes:
+    """ Serialized IQuizSchema from the cache when its version is current, built on the first request after
+    a change. Students get the payload without is_correct, unknown languages fall back to the default one """
+    language_code = supported_language(language_code)
+    key = (quiz_block_id, language_code, with_answer_key)
+    version = quiz_version(db_session, quiz_block_id)
+    cached = quiz_payload_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    quiz = IQuizSchema(**build_quiz(db_session, quiz_block_id, language_code))
+    body = quiz.json(exclude=None if with_answer_key else STUDENT_EXCLUDE).encode()
+    quiz_payload_cache.set(key, (version, body))
+    return body
+
+
+@event.listens_for(Session, 'after_flush')
+def quiz_payload_after_flush_event(session, flush_context):
+    """ Drops cached payloads of the changed quizzes, other workers see the new version on their next request """
+    quiz_block_ids, question_ids, answer_ids = set(), set(), set()
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, QuizBlock):
+            quiz_block_ids.add(obj.id)
+        elif isinstance(obj, (LinkQuizBlockQuestion, QuizBlockQuestionSort)):
+            quiz_block_ids.add(obj.quiz_block_id)
+        elif isinstance(obj, Question):
+            question_ids.add(obj.id)
+        elif isinstance(obj, (QuestionTranslation, Answer)):
+            question_ids.add(obj.question_id)
+        elif isinstance(obj, AnswerTranslation):
+            answer_ids.add(obj.answer_id)
+    if question_ids or answer_ids:
+        question_ids |= set(session.connection().execute(
+            select(Answer.question_id).where(Answer.id.in_(answer_ids))).scalars()) if answer_ids else set()
+        quiz_block_ids |= set(session.connection().execute(
+            select(LinkQuizBlockQuestion.quiz_block_id).where(LinkQuizBlockQuestion.question_id.in_(question_ids))
+        ).scalars())
+    if quiz_block_ids:
+        session.info.setdefault('quiz_payload_changed', set()).update(quiz_block_ids)
+
+
+@event.listens_for(Session, 'after_commit')
+def quiz_payload_after_commit_event(session):
+    quiz_block_ids = session.info.pop('quiz_payload_changed', None)
+    if quiz_block_ids:
+        quiz_payload_cache.invalidate(lambda key: key[0] in quiz_block_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def quiz_payload_after_rollback_event(session):
+    session.info.pop('quiz_payload_changed', None)
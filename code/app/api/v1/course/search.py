@@ -0,0 +1,79 @@
+import math
+
+from sqlalchemy import cast, func, literal, select, true, union_all
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.orm import Session
+
+from api.v1.exceptions import CustomValidationError
+from api.v1.helper.counting import count_results
+from api.v1.helper.translation import language_ids
+from api.v1.models import (Course, CourseLesson, CourseLessonTranslation, CourseModule, CourseModuleTranslation,
+                           CourseStatusEnum, CourseTranslation)
+from core.babel_config import _
+
+# text search configuration per language, PostgreSQL has no Uzbek stemmer so uz (and others) use 'simple'.
+# Must match translation_search_vector_update() in migration 2a7d5e8f1c63.
+SEARCH_CONFIGS = {'ru': 'russian', 'en': 'english'}
+
+HEADLINE_OPTIONS = 'MaxFragments=2, MaxWords=30, MinWords=10, StartSel=<b>, StopSel=</b>'
+
+
+def search_config(language_code: str) -> str:
+    return SEARCH_CONFIGS.get(language_code, 'simple')
+
+
+def _hits(language_id: int, query):
+    """ Matching course, module and lesson translations of visible courses as one UNION ALL """
+    visible = (Course.is_active == true(), Course.status == CourseStatusEnum.PUBLIC)
+    courses = select(
+        literal('course').label('type'), CourseTranslation.course_id.label('id'), CourseTranslation.course_id,
+        CourseTranslation.title, CourseTranslation.desc,
+        func.ts_rank_cd(CourseTranslation.search_vector, query).label('rank'),
+    ).join(Course).where(CourseTranslation.language_id == language_id,
+                         CourseTranslation.search_vector.op('@@')(query), *visible)
+    modules = select(
+        literal('module').label('type'), CourseModule.id, CourseModule.course_id,
+        CourseModuleTranslation.title, CourseModuleTranslation.desc,
+        func.ts_rank_cd(CourseModuleTranslation.search_vector, query).label('rank'),
+    ).select_from(CourseModuleTranslation).join(CourseModule).join(Course).where(
+        CourseModuleTranslation.language_id == language_id, CourseModuleTranslation.search_vector.op('@@')(query),
+        CourseModule.is_active == true(), *visible)
+    lessons = select(
+        literal('lesson').label('type'), CourseLesson.id, CourseModule.course_id,
+        CourseLessonTranslation.title, CourseLessonTranslation.desc,
+        func.ts_rank_cd(CourseLessonTranslation.search_vector, query).label('rank'),
+    ).select_from(CourseLessonTranslation).join(CourseLesson).join(CourseModule).join(Course).where(
+        CourseLessonTranslation.language_id == language_id, CourseLessonTranslation.search_vector.op('@@')(query),
+        CourseLesson.is_active == true(), CourseModule.is_active == true(), *visible)
+    return union_all(courses, modules, lessons).subquery('hits')
+
+
+def search_courses(db_session: Session, text: str, language_code: str, page_number: int = 1,
+                   page_size: int = 20) -> dict:
+    """ Ranked full text search over course, module and lesson translations of one language.
+    Values for BaseListResponseSchema, ts_headline runs for the returned page only """
+    language_id = language_ids(db_session).get(language_code)
+    if language_id is None:
+        raise CustomValidationError(_('Language not found'))
+    config = cast(search_config(language_code), REGCONFIG)
+    query = func.websearch_to_tsquery(config, text)
+    hits = _hits(language_id, query)
+
+    total, is_exact = count_results(db_session, select(hits))
+    page = select(hits).order_by(hits.c.rank.desc(), hits.c.type, hits.c.id) \
+        .limit(page_size).offset((page_number - 1) * page_size).subquery('page')
+    results = db_session.execute(
+        select(
+            page.c.type, page.c.id, page.c.course_id, page.c.title, page.c.rank,
+            func.ts_headline(config, page.c.title, query, 'HighlightAll=true').label('title_highlight'),
+            func.ts_headline(config, func.coalesce(page.c.desc, ''), query, HEADLINE_OPTIONS).label('desc_highlight'),
+        ).order_by(page.c.rank.desc(), page.c.type, page.c.id)
+    ).mappings().all()
+    return {
+        "page_number": page_number,
+        "page_size": page_size,
+        "num_pages": math.ceil(total / page_size) if page_size else 0,
+        "total_results": total,
+        "is_total_exact": is_exact,
+        "results": results,
+    }
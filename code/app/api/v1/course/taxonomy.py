@@ -0,0 +1,116 @@
+import hashlib
+import itertools
+from typing import Optional
+
+from sqlalchemy import event, inspect, select, true
+from sqlalchemy.orm import Session
+
+from api.v1.helper.translation import (language_preference, parent_column, preferred_translation_stmt,
+                                       supported_language)
+from api.v1.models import (Category, CategoryTranslation, Media, Profession, ProfessionTranslation, Topic,
+                           TopicTranslation)
+from api.v1.schemas.site.course.taxonomy_schema import ITaxonomySchema
+from core.babel_config import ALLOWED_LANGUAGES
+from core.config import settings
+from utils.cache import LRUCache
+
+TAXONOMY_MODELS = (Profession, ProfessionTranslation, Topic, TopicTranslation, Category, CategoryTranslation)
+
+
+class TaxonomySnapshot:
+    """ Serialized tree of one language, version is a hash of the content and serves as ETag """
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.version = hashlib.sha1(body).hexdigest()
+
+
+# language code -> TaxonomySnapshot, the TTL bounds staleness of the other workers
+taxonomy_cache = LRUCache(maxsize=len(ALLOWED_LANGUAGES) * 2, ttl=settings.taxonomy_cache_ttl)
+
+
+def _translations(db_session: Session, translation_model, language_ids: list[int]) -> dict:
+    rows = db_session.execute(preferred_translation_stmt(translation_model, language_ids)).scalars().all()
+    parent = parent_column(translation_model).key
+    return {getattr(row, parent): row for row in rows}
+
+
+def _active(model):
+    return select(model).where(model.is_active == true()).order_by(model.sort, model.id)
+
+
+def _node(obj, translation) -> dict:
+    return {
+        "id": obj.id,
+        "slug": obj.slug,
+        "sort": obj.sort,
+        "title": translation.title if translation else None,
+        "desc": translation.desc if translation else None,
+    }
+
+
+def build_taxonomy(db_session: Session, language_code: Optional[str] = None) -> dict:
+    """ Active Profession -> Topic -> Category tree in one language, six queries whatever its size """
+    language_ids = language_preference(db_session, language_code)
+    professions = db_session.execute(_active(Profession)).scalars().all()
+    topics = db_session.execute(_active(Topic)).scalars().all()
+    categories = db_session.execute(
+        _active(Category).add_columns(Media.path).outerjoin(Media, Media.id == Category.logo_id)).all()
+    profession_translations = _translations(db_session, ProfessionTranslation, language_ids)
+    topic_translations = _translations(db_session, TopicTranslation, language_ids)
+    category_translations = _translations(db_session, CategoryTranslation, language_ids)
+
+    categories_by_topic = {}
+    for category, logo_path in categories:
+        node = _node(category, category_translations.get(category.id))
+        node["logo_path"] = logo_path
+        categories_by_topic.setdefault(category.topic_id, []).append(node)
+    topics_by_profession = {}
+    for topic in topics:
+        node = _node(topic, topic_translations.get(topic.id))
+        node["categories"] = categories_by_topic.get(topic.id, [])
+        topics_by_profession.setdefault(topic.profession_id, []).append(node)
+    tree = []
+    for profession in professions:
+        node = _node(profession, profession_translations.get(profession.id))
+        node["topics"] = topics_by_profession.get(profession.id, [])
+        tree.append(node)
+    return {"language": language_code, "professions": tree}
+
+
+def get_taxonomy(db_session: Session, language_code: Optional[str] = None) -> TaxonomySnapshot:
+    """ Snapshot from the cache, built on the first request after a change. Unknown languages fall back to the
+    default one, so arbitrary codes can not evict the cached snapshots """
+    language_code = supported_language(language_code)
+    snapshot = taxonomy_cache.get(language_code)
+    if snapshot is None:
+        taxonomy = ITaxonomySchema(**build_taxonomy(db_session, language_code))
+        snapshot = TaxonomySnapshot(taxonomy.json().encode())
+        taxonomy_cache.set(language_code, snapshot)
+    return snapshot
+
+
+def _changes_taxonomy(session, obj) -> bool:
+    if isinstance(obj, TAXONOMY_MODELS):
+        return True
+    # category logos are served by path, a new Media row only shows up once a category points at it
+    if not isinstance(obj, Media) or obj in session.new:
+        return False
+    return obj in session.deleted or inspect(obj).attrs.path.history.has_changes()
+
+
+@event.listens_for(Session, 'after_flush')
+def taxonomy_after_flush_event(session, flush_context):
+    if any(_changes_taxonomy(session, obj) for obj in itertools.chain(session.new, session.dirty, session.deleted)):
+        session.info['taxonomy_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def taxonomy_after_commit_event(session):
+    if session.info.pop('taxonomy_changed', False):
+        taxonomy_cache.clear()
+
+
+@event.listens_for(Session, 'after_rollback')
+def taxonomy_after_rollback_event(session):
+    session.info.pop('taxonomy_changed', None)
@@ -0,0 +1,152 @@
+import datetime
+import decimal
+import itertools
+import json
+import uuid
+from typing import Iterable, Iterator
+
+from sqlalchemy import select, types
+
+from api.v1.course.tree import COURSE_TREE, allocate_ids, tree_ids_statements
+from api.v1.exceptions import CustomValidationError
+from api.v1.models import Course, Language, refresh_course_stats
+from core.babel_config import _
+
+FORMAT = 'course-tree'
+FORMAT_VERSION = 1
+NODES = {node.name: node for node in COURSE_TREE}
+
+
+def _default(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _loads_value(column, value):
+    """ Reverse of _default for the column type """
+    if value is None or not isinstance(value, str):
+        return value
+    if isinstance(column.type, types.Uuid):
+        return uuid.UUID(value)
+    if isinstance(column.type, types.DateTime):
+        return datetime.datetime.fromisoformat(value)
+    if isinstance(column.type, types.Date):
+        return datetime.date.fromisoformat(value)
+    return value
+
+
+def _dumps(data: dict) -> str:
+    return json.dumps(data, default=_default, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def export_courses(connection, course_ids: list[int], batch_size: int = 1000) -> Iterator[str]:
+    """ JSON Lines of whole course trees: a header, then one line per row, parents before children.
+
+    Rows are streamed with a server side cursor, memory does not grow with the size of the course.
+    """
+    languages = dict(connection.execute(select(Language.id, Language.code)).all())
+    yield _dumps({"format": FORMAT, "version": FORMAT_VERSION, "languages": languages})
+    statements = tree_ids_statements(select(Course.id).where(Course.id.in_(course_ids)))
+    for node in COURSE_TREE:
+        stmt = select(node.table).where(node.table.c.id.in_(statements[node.model])).order_by(node.table.c.id)
+        result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(stmt)
+        for row in result.mappings():
+            yield _dumps({"table": node.name, "id": row['id'],
+                          "data": {column: row[column] for column in node.copied_columns}})
+
+
+class CourseImporter:
+    """ Inserts exported rows table by table in batches with pre-allocated ids.
+
+    Only the old -> new id maps are kept in memory. Languages are matched by code, references outside of the
+    tree (media, categories, tags, trainings) are kept as they are.
+    """
+
+    def __init__(self, connection, organization_id, created_by_id, batch_size: int = 1000):
+        self.connection = connection
+        self.organization_id = organization_id
+        self.created_by_id = created_by_id
+        self.batch_size = batch_size
+        self.id_maps = {}
+        self.language_ids = {}
+
+    def read_header(self, header: dict):
+        if header.get("format") != FORMAT or header.get("version") != FORMAT_VERSION:
+            raise CustomValidationError(_('Unsupported import format'))
+        local = dict(self.connection.execute(select(Language.code, Language.id)).all())
+        for language_id, code in header["languages"].items():
+            if code in local:
+                self.language_ids[int(language_id)] = local[code]
+
+    def _map(self, model_name: str, old_id):
+        try:
+            return self.id_maps[model_name][old_id]
+        except KeyError:
+            raise CustomValidationError(_('Broken import file: {table} {id} is missing').format(
+                table=model_name, id=old_id))
+
+    def _row(self, node, record: dict, new_id: int) -> dict:
+        row = dict(record["data"], id=new_id)
+        if node.parent is not None:
+            column, parent_model = node.parent
+            row[column] = self._map(parent_model.__table__.name, row[column])
+        for column, model in node.refs.items():
+            row[column] = self._map(model.__table__.name, row[column])
+        if 'language_id' in row:
+            if row['language_id'] not in self.language_ids:
+                raise CustomValidationError(_('Language not found'))
+            row['language_id'] = self.language_ids[row['language_id']]
+        if 'created_by_id' in row:
+            row['created_by_id'] = self.created_by_id
+        if node.model is Course:
+            row['organization_id'] = self.organization_id
+        return {key: _loads_value(node.table.c[key], value) for key, value in row.items()}
+
+    def _allocate_slugs(self, node, rows: list[dict]):
+        """ Keeps the exported slug when it is free, otherwise suffixes it with the new id (unique as well) """
+        slugs = [row['slug'] for row in rows]
+        taken = set(self.connection.execute(select(node.table.c.slug).where(node.table.c.slug.in_(slugs))).scalars())
+        for row in rows:
+            if row['slug'] in taken:
+                row['slug'] = f"{row['slug']}-{row['id']}"
+
+    def insert_batch(self, node, records: list[dict]):
+        new_ids = allocate_ids(self.connection, node, len(records))
+        rows = [self._row(node, record, new_id) for record, new_id in zip(records, new_ids)]
+        if node.has_slug:
+            self._allocate_slugs(node, rows)
+        self.id_maps.setdefault(node.name, {}).update(
+            (record["id"], new_id) for record, new_id in zip(records, new_ids))
+        # executemany of a Core insert is sent as multi-row INSERT ... VALUES batches
+        self.connection.execute(node.table.insert(), rows)
+
+    def run(self, lines: Iterable[str]) -> list[int]:
+        """ Imports the lines, returns ids of the new courses """
+        lines = (line for line in lines if line.strip())
+        header = next(lines, None)
+        if header is None:
+            raise CustomValidationError(_('Import file is empty'))
+        self.read_header(json.loads(header))
+        records = (json.loads(line) for line in lines)
+        for table, table_records in itertools.groupby(records, key=lambda record: record["table"]):
+            node = NODES.get(table)
+            if node is None:
+                raise CustomValidationError(_('Unknown table {table}').format(table=table))
+            while batch := list(itertools.islice(table_records, self.batch_size)):
+                self.insert_batch(node, batch)
+        course_ids = list(self.id_maps.get(Course.__table__.name, {}).values())
+        if course_ids:
+            refresh_course_stats(self.connection, course_ids)
+        return course_ids
+
+
+def import_courses(connection, lines: Iterable[str], organization_id, created_by_id,
+                   batch_size: int = 1000) -> list[int]:
+    """ Imports exported course trees in the connection transaction """
+    return CourseImporter(connection, organization_id, created_by_id, batch_size).run(lines)
+
@@ -0,0 +1,109 @@
+from typing import Callable, Optional
+
+from sqlalchemy import func, select
+
+from api.v1.models import (AboutCourseFormatBlock, AboutCourseFormatBlockTranslation, Answer, AnswerTranslation,
+                           Course, CourseLesson, CourseLessonMedia, CourseLessonTranslation, CourseLessonVideo,
+                           CourseModule, CourseModuleTranslation, CoursePlanBlock, CoursePlanBlockTranslation,
+                           CourseTranslation, FileBlock, ForWhomCourseBlock, ForWhomCourseBlockTranslation,
+                           LinkCategoryCourse, LinkCourseTag, LinkQuizBlockQuestion, Question, QuestionTranslation,
+                           QuizBlock, QuizBlockQuestionSort, TextBlock, TextBlockTranslation, TrainingBlock,
+                           VideoBlock, WhatLearnCourseBlock, WhatLearnCourseBlockTranslation)
+
+# columns never copied, they get new values on insert
+SKIPPED_COLUMNS = {'id', 'created_at', 'updated_at', 'deleted_at', 'search_vector'}
+
+
+class TreeNode:
+    """ One table of the course tree.
+
+    Rows belong to the tree through `parent` (column pointing to the parent node) or a custom `selector`,
+    `refs` are further columns pointing to other tables of the tree. Slugs of `has_slug` tables are unique.
+    """
+
+    def __init__(self, model, parent: Optional[tuple] = None, refs: Optional[dict] = None,
+                 selector: Optional[Callable] = None):
+        self.model = model
+        self.table = model.__table__
+        self.parent = parent
+        self.refs = refs or {}
+        self.selector = selector
+        self.has_slug = 'slug' in self.table.c
+
+    @property
+    def name(self) -> str:
+        return self.table.name
+
+    @property
+    def copied_columns(self) -> list[str]:
+        return [column.key for column in self.table.columns if column.key not in SKIPPED_COLUMNS]
+
+    def ids_stmt(self, ids_of: Callable):
+        """ Ids of the rows of the tree, ids_of(model) gives the same for the other nodes """
+        if self.selector is not None:
+            return self.selector(ids_of)
+        column, parent_model = self.parent
+        return select(self.table.c.id).where(self.table.c[column].in_(ids_of(parent_model)))
+
+
+def _questions(ids_of):
+    return select(LinkQuizBlockQuestion.question_id).where(
+        LinkQuizBlockQuestion.quiz_block_id.in_(ids_of(QuizBlock))).distinct()
+
+
+# parents always come before their children, quiz questions are shared through links and copied once per course
+COURSE_TREE = [
+    TreeNode(Course, selector=lambda ids_of: ids_of(Course)),
+    TreeNode(CourseTranslation, ('course_id', Course)),
+    TreeNode(LinkCategoryCourse, ('course_id', Course)),
+    TreeNode(LinkCourseTag, ('course_id', Course)),
+    TreeNode(AboutCourseFormatBlock, ('course_id', Course)),
+    TreeNode(AboutCourseFormatBlockTranslation, ('parent_id', AboutCourseFormatBlock)),
+    TreeNode(ForWhomCourseBlock, ('course_id', Course)),
+    TreeNode(ForWhomCourseBlockTranslation, ('parent_id', ForWhomCourseBlock)),
+    TreeNode(WhatLearnCourseBlock, ('course_id', Course)),
+    TreeNode(WhatLearnCourseBlockTranslation, ('parent_id', WhatLearnCourseBlock)),
+    TreeNode(CoursePlanBlock, ('course_id', Course)),
+    TreeNode(CoursePlanBlockTranslation, ('parent_id', CoursePlanBlock)),
+    TreeNode(CourseModule, ('course_id', Course)),
+    TreeNode(CourseModuleTranslation, ('course_module_id', CourseModule)),
+    TreeNode(CourseLesson, ('course_module_id', CourseModule)),
+    TreeNode(CourseLessonTranslation, ('course_lesson_id', CourseLesson)),
+    TreeNode(CourseLessonVideo, ('course_lesson_id', CourseLesson)),
+    TreeNode(CourseLessonMedia, ('course_lesson_id', CourseLesson)),
+    TreeNode(VideoBlock, ('course_lesson_id', CourseLesson)),
+    TreeNode(TextBlock, ('course_lesson_id', CourseLesson)),
+    TreeNode(TextBlockTranslation, ('text_block_id', TextBlock)),
+    TreeNode(FileBlock, ('course_lesson_id', CourseLesson)),
+    TreeNode(TrainingBlock, ('course_lesson_id', CourseLesson)),
+    TreeNode(QuizBlock, ('course_lesson_id', CourseLesson)),
+    TreeNode(Question, selector=_questions),
+    TreeNode(QuestionTranslation, ('question_id', Question)),
+    TreeNode(Answer, ('question_id', Question)),
+    TreeNode(AnswerTranslation, ('answer_id', Answer)),
+    TreeNode(LinkQuizBlockQuestion, ('quiz_block_id', QuizBlock), refs={'question_id': Question}),
+    TreeNode(QuizBlockQuestionSort, ('quiz_block_id', QuizBlock), refs={'question_id': Question}),
+]
+
+
+def tree_ids_statements(course_ids_stmt) -> dict:
+    """ model -> statement selecting the ids of its rows in the tree of the given courses """
+    statements = {}
+
+    def ids_of(model):
+        if model is Course:
+            return course_ids_stmt
+        return statements[model]
+
+    for node in COURSE_TREE:
+        if node.model is not Course:
+            statements[node.model] = node.ids_stmt(ids_of)
+    statements[Course] = course_ids_stmt
+    return statements
+
+
+def allocate_ids(connection, node: TreeNode, count: int) -> list[int]:
+    """ Takes `count` ids from the table sequence in one round trip, so rows can be inserted with known ids """
+    sequence = func.pg_get_serial_sequence(node.name, 'id')
+    stmt = select(func.nextval(sequence)).select_from(func.generate_series(1, count))
+    return connection.execute(stmt).scalars().all()
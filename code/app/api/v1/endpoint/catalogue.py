@@ -0,0 +1,24 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from api.v1.helper.pagination import keyset_page, keyset_stmt
+from api.v1.models.catalogue_model import catalogue_stmt, course_catalogue
+from api.v1.schemas.data_types import DifficultyLevelEnum
+from api.v1.schemas.site.course.catalogue_schema import ICatalogueCursorListResponseSchema
+from core.babel_config import ALLOWED_LANGUAGES
+from db.session import get_db
+
+router = APIRouter()
+
+
+@router.get('/', response_model=ICatalogueCursorListResponseSchema)
+def course_catalogue_list(language: str = Query(ALLOWED_LANGUAGES[0]), category_id: Optional[int] = None,
+                          tag_id: Optional[int] = None, level: Optional[DifficultyLevelEnum] = None,
+                          is_for_child: Optional[bool] = None, cursor: Optional[str] = None,
+                          page_size: int = Query(20, ge=1, le=100), db_session: Session = Depends(get_db)):
+    stmt = catalogue_stmt(language, category_id=category_id, tag_id=tag_id, level=level, is_for_child=is_for_child)
+    keys = (course_catalogue.c.course_id,)
+    rows = db_session.execute(keyset_stmt(stmt, keys, cursor, page_size, descending=True)).all()
+    return keyset_page(rows, keys, page_size)
@@ -0,0 +1,32 @@
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from core.config import settings
+from db import slow_query
+from db.pool import collect_pool_stats
+from db.session import engines
+
+
+def require_internal_token(x_internal_token: Optional[str] = Header(None)):
+    """ Pool and query internals are only served to callers holding INTERNAL_API_TOKEN """
+    token = settings.internal_api_token
+    if not settings.internal_endpoints_enabled or not token or x_internal_token is None \
+            or not secrets.compare_digest(x_internal_token.encode(), token.encode()):
+        raise HTTPException(404)
+
+
+router = APIRouter(dependencies=[Depends(require_internal_token)])
+
+
+@router.get('/pool')
+def pool_stats():
+    return collect_pool_stats(engines)
+
+
+@router.get('/slow-queries')
+def slow_queries():
+    if slow_query.slow_query_recorder is None:
+        return []
+    return slow_query.slow_query_recorder.as_list()
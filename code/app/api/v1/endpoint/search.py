@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from api.v1.course.search import search_courses
+from api.v1.schemas.site.course.search_schema import ICourseSearchListResponseSchema
+from core.babel_config import ALLOWED_LANGUAGES
+from db.session import get_db
+
+router = APIRouter()
+
+
+@router.get('/courses', response_model=ICourseSearchListResponseSchema)
+def course_search(q: str = Query(..., min_length=1, max_length=200), language: str = Query(ALLOWED_LANGUAGES[0]),
+                  page_number: int = Query(1, ge=1), page_size: int = Query(20, ge=1, le=100),
+                  db_session: Session = Depends(get_db)):
+    return search_courses(db_session, q, language, page_number, page_size)
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.orm import Session
+
+from api.v1.course.taxonomy import get_taxonomy
+from api.v1.schemas.site.course.taxonomy_schema import ITaxonomySchema
+from core.babel_config import ALLOWED_LANGUAGES
+from db.session import get_db
+
+router = APIRouter()
+
+
+@router.get('/', response_model=ITaxonomySchema)
+def taxonomy_tree(request: Request, language: str = Query(ALLOWED_LANGUAGES[0]),
+                  db_session: Session = Depends(get_db)):
+    # the snapshot is already serialized, returned as is
+    snapshot = get_taxonomy(db_session, language)
+    etag = f'"{snapshot.version}"'
+    if request.headers.get('if-none-match') == etag:
+        return Response(status_code=304, headers={'ETag': etag})
+    return Response(content=snapshot.body, media_type='application/json', headers={'ETag': etag})
@@ -0,0 +1,113 @@
+import enum
+import logging
+import math
+from typing import Optional
+
+from sqlalchemy import Select, Table, column, func, select, table
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+pg_class = table('pg_class', column('oid'), column('reltuples'))
+
+count_cache = LRUCache(maxsize=settings.count_cache_size, ttl=settings.count_cache_ttl)
+
+
+class CountStrategyEnum(str, enum.Enum):
+    AUTO = 'auto'
+    EXACT = 'exact'
+    ESTIMATE = 'estimate'
+    CACHED = 'cached'
+
+
+def exact_count(db_session: Session, stmt: Select) -> int:
+    count_stmt = select(func.count()).select_from(stmt.order_by(None).limit(None).offset(None).subquery())
+    return db_session.execute(count_stmt).scalar() or 0
+
+
+def _unfiltered_table(stmt: Select) -> Optional[Table]:
+    froms = stmt.get_final_froms()
+    if stmt.whereclause is None and len(froms) == 1 and isinstance(froms[0], Table) and not stmt._group_by_clauses \
+            and not stmt._distinct:
+        return froms[0]
+    return None
+
+
+def table_estimate(db_session: Session, db_table: Table) -> Optional[int]:
+    """ Row count the planner keeps in pg_class, None when the table was never analyzed """
+    name = '.'.join(f'"{part}"' for part in db_table.fullname.split('.'))
+    stmt = select(pg_class.c.reltuples).where(pg_class.c.oid == func.to_regclass(name))
+    reltuples = db_session.execute(stmt).scalar()
+    if reltuples is None or reltuples < 0:
+        return None
+    return int(reltuples)
+
+
+def plan_estimate(db_session: Session, stmt: Select) -> Optional[int]:
+    """ Row estimate of the top plan node from EXPLAIN (without ANALYZE, nothing is executed) """
+    try:
+        # savepoint: a failed EXPLAIN must not abort the transaction of the request
+        with db_session.begin_nested():
+            connection = db_session.connection()
+            compiled = stmt.order_by(None).limit(None).offset(None).compile(
+                dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+            plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}").scalar()
+    except Exception as e:
+        logger.warning(f"Count estimate error: {e}")
+        return None
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def cached_count(db_session: Session, stmt: Select) -> tuple[int, bool]:
+    compiled = stmt.compile(dialect=db_session.get_bind().dialect)
+    key = (str(compiled), tuple(sorted((k, repr(v)) for k, v in compiled.params.items())))
+    total = count_cache.get(key)
+    if total is not None:
+        return total, False
+    total = exact_count(db_session, stmt)
+    count_cache.set(key, total)
+    return total, True
+
+
+def count_results(db_session: Session, stmt: Select,
+                  strategy: CountStrategyEnum = CountStrategyEnum.AUTO) -> tuple[int, bool]:
+    """ Returns (total, is_exact).
+
+    AUTO counts exactly while the planner expects less than COUNT_EXACT_THRESHOLD rows, large unfiltered
+    tables use pg_class.reltuples and large filtered sets a TTL cached exact count.
+    """
+    if strategy == CountStrategyEnum.EXACT:
+        return exact_count(db_session, stmt), True
+    if strategy == CountStrategyEnum.CACHED:
+        return cached_count(db_session, stmt)
+
+    db_table = _unfiltered_table(stmt)
+    estimate = table_estimate(db_session, db_table) if db_table is not None else plan_estimate(db_session, stmt)
+    if strategy == CountStrategyEnum.ESTIMATE:
+        if estimate is None:
+            return exact_count(db_session, stmt), True
+        return estimate, False
+
+    if estimate is None or estimate < settings.count_exact_threshold:
+        return exact_count(db_session, stmt), True
+    if db_table is not None:
+        return estimate, False
+    return cached_count(db_session, stmt)
+
+
+def paginate_offset(db_session: Session, stmt: Select, page_number: int = 1, page_size: int = 20,
+                    strategy: CountStrategyEnum = CountStrategyEnum.AUTO) -> dict:
+    """ Values for BaseListResponseSchema """
+    total, is_exact = count_results(db_session, stmt, strategy)
+    results = db_session.execute(stmt.limit(page_size).offset((page_number - 1) * page_size)).scalars().unique().all()
+    return {
+        "page_number": page_number,
+        "page_size": page_size,
+        "num_pages": math.ceil(total / page_size) if page_size else 0,
+        "total_results": total,
+        "is_total_exact": is_exact,
+        "results": results,
+    }
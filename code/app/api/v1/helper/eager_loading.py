@@ -0,0 +1,48 @@
+import functools
+import inspect as pyinspect
+
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, selectinload
+
+
+def _nested_schema(field):
+    """ Schema of a relationship field: X, Optional[X] and List[X] all give X """
+    nested = field.type_
+    if pyinspect.isclass(nested) and issubclass(nested, BaseModel):
+        return nested
+    return None
+
+
+def _plan(model, schema, depth: int, path: frozenset) -> tuple:
+    if depth <= 0:
+        return ()
+    relationships = inspect(model).relationships
+    options = []
+    for field in schema.__fields__.values():
+        relationship = relationships.get(field.alias)
+        # never walk a relationship twice or back along the one we came from
+        if relationship is None or relationship in path or path & relationship._reverse_property:
+            continue
+        attribute = getattr(model, relationship.key)
+        # collections get their own SELECT ... IN, scalars are joined to the parent row
+        loader = selectinload(attribute) if relationship.uselist else joinedload(attribute)
+        nested = _nested_schema(field)
+        if nested is not None:
+            children = _plan(relationship.mapper.class_, nested, depth - 1, path | {relationship})
+            if children:
+                loader = loader.options(*children)
+        options.append(loader)
+    return tuple(options)
+
+
+@functools.lru_cache(maxsize=256)
+def schema_load_options(model, schema, max_depth: int = 4) -> tuple:
+    """ Loader options for exactly the relationships the read schema serializes, nested schemas included:
+
+    select(Course).options(*schema_load_options(Course, ACourseReadSchema))
+
+    Query count is bounded by the number of collections in the schema, not by the number of rows.
+    Properties that touch relationships internally (e.g. User.full_name) are not visible here.
+    """
+    return _plan(model, schema, max_depth, frozenset())
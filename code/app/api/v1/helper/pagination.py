@@ -0,0 +1,93 @@
+import base64
+import datetime
+import decimal
+import json
+import uuid
+from typing import Optional
+
+from sqlalchemy import Select, tuple_
+from sqlalchemy.orm import Session
+
+from api.v1.exceptions import CustomValidationError
+from core.babel_config import _
+
+
+def _encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"d": value.isoformat()}
+    if isinstance(value, uuid.UUID):
+        return {"u": str(value)}
+    if isinstance(value, decimal.Decimal):
+        return {"n": str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return datetime.date.fromisoformat(value["d"])
+        if "u" in value:
+            return uuid.UUID(value["u"])
+        if "n" in value:
+            return decimal.Decimal(value["n"])
+    return value
+
+
+def encode_cursor(values: list) -> str:
+    data = json.dumps([_encode_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        return [_decode_value(value) for value in json.loads(data)]
+    except (ValueError, TypeError):
+        raise CustomValidationError(_('Invalid cursor'))
+
+
+def keyset_stmt(stmt: Select, keys: tuple, cursor: Optional[str], page_size: int, descending: bool) -> Select:
+    """ Restricts the statement to the rows after the cursor in (sort key, id) order """
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(keys):
+            raise CustomValidationError(_('Invalid cursor'))
+        row, after = tuple_(*keys), tuple_(*values)
+        stmt = stmt.where(row < after if descending else row > after)
+    return stmt.order_by(*(key.desc() if descending else key.asc() for key in keys)).limit(page_size + 1)
+
+
+def keyset_page(rows: list, keys: tuple, page_size: int) -> dict:
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = encode_cursor([getattr(rows[-1], key.key) for key in keys]) if has_more else None
+    return {"results": rows, "page_size": page_size, "next_cursor": next_cursor, "has_more": has_more}
+
+
+def _keys(id_column, sort_column) -> tuple:
+    if sort_column is None or sort_column is id_column:
+        return (id_column,)
+    return sort_column, id_column
+
+
+def paginate_keyset(db_session: Session, stmt: Select, id_column, sort_column=None, cursor: Optional[str] = None,
+                    page_size: int = 20, descending: bool = True) -> dict:
+    """ Cursor pagination over (sort_column, id_column), no OFFSET and no COUNT(*).
+
+    Without sort_column rows are ordered by the primary key only, which is creation order for the uuid7
+    and serial keys. sort_column must be NOT NULL, otherwise rows with NULL are never reached.
+    """
+    keys = _keys(id_column, sort_column)
+    rows = db_session.execute(keyset_stmt(stmt, keys, cursor, page_size, descending)).scalars().unique().all()
+    return keyset_page(rows, keys, page_size)
+
+
+async def async_paginate_keyset(db_session, stmt: Select, id_column, sort_column=None, cursor: Optional[str] = None,
+                                page_size: int = 20, descending: bool = True) -> dict:
+    keys = _keys(id_column, sort_column)
+    result = await db_session.execute(keyset_stmt(stmt, keys, cursor, page_size, descending))
+    return keyset_page(result.scalars().unique().all(), keys, page_size)
@@ -0,0 +1,133 @@
+from types import SimpleNamespace
+from typing import Iterable, Optional
+
+from sqlalchemy import case, func, inspect, select
+from sqlalchemy.orm import Session, aliased, selectinload
+
+from api.v1.models import Language
+from core.babel_config import ALLOWED_LANGUAGES
+from core.config import settings
+from utils.cache import LRUCache
+
+# (table, parent_id, language_id, updated_at) -> column values of the translation row
+translation_cache = LRUCache(maxsize=settings.translation_cache_size)
+language_cache = LRUCache(maxsize=1, ttl=settings.translation_language_cache_ttl)
+
+
+def parent_column(translation_model):
+    """ Foreign key column to the translated row, e.g. CourseTranslation.course_id """
+    for column in inspect(translation_model).columns:
+        if column.foreign_keys and column.key != 'language_id':
+            return getattr(translation_model, column.key)
+    raise ValueError(f"{translation_model.__name__} has no parent foreign key")
+
+
+def supported_language(language_code: Optional[str]) -> str:
+    """ The code when it is one of ALLOWED_LANGUAGES, the default language otherwise """
+    return language_code if language_code in ALLOWED_LANGUAGES else ALLOWED_LANGUAGES[0]
+
+
+def language_ids(db_session: Session) -> dict[str, int]:
+    """ Language code -> id, languages change rarely so the map is cached for a while """
+    return language_cache.get_or_set(
+        'codes', lambda: dict(db_session.execute(select(Language.code, Language.id)).all()))
+
+
+def language_preference(db_session: Session, language_code: Optional[str] = None) -> list[int]:
+    """ Requested language first, then ALLOWED_LANGUAGES order, then any other language """
+    ids = language_ids(db_session)
+    codes = [language_code] + ALLOWED_LANGUAGES if language_code else list(ALLOWED_LANGUAGES)
+    codes += sorted(code for code in ids if code not in codes)
+    return list(dict.fromkeys(ids[code] for code in codes if code in ids))
+
+
+def resolve_translations(db_session: Session, translation_model, parent_ids: Iterable,
+                         language_code: Optional[str] = None) -> dict:
+    """ One translation per parent in the preferred language, parent_id -> SimpleNamespace of the row columns.
+
+    A version stamp query picks the rows, only rows missing in the cache (or updated since) are fetched.
+    """
+    parent_ids = list(dict.fromkeys(parent_ids))
+    if not parent_ids:
+        return {}
+    parent = parent_column(translation_model)
+    table = translation_model.__table__.name
+    preference = language_preference(db_session, language_code)
+    rank = {language_id: index for index, language_id in enumerate(preference)}
+
+    stamp = func.coalesce(translation_model.updated_at, translation_model.created_at)
+    stamps = db_session.execute(
+        select(parent, translation_model.language_id, translation_model.id, stamp)
+        .where(parent.in_(parent_ids), translation_model.language_id.in_(preference))
+    ).all()
+    chosen = {}
+    for parent_id, language_id, translation_id, updated_at in stamps:
+        current = chosen.get(parent_id)
+        if current is None or rank[language_id] < rank[current[0]]:
+            chosen[parent_id] = (language_id, translation_id, updated_at)
+
+    result, missing = {}, {}
+    for parent_id, (language_id, translation_id, updated_at) in chosen.items():
+        key = (table, parent_id, language_id, updated_at)
+        values = translation_cache.get(key)
+        if values is None:
+            missing[translation_id] = key
+        else:
+            result[parent_id] = values
+    if missing:
+        columns = [attr.key for attr in inspect(translation_model).column_attrs if not attr.deferred]
+        rows = db_session.execute(
+            select(*(getattr(translation_model, column) for column in columns))
+            .where(translation_model.id.in_(list(missing)))
+        ).mappings().all()
+        for row in rows:
+            key = missing[row['id']]
+            values = dict(row)
+            translation_cache.set(key, values)
+            result[key[1]] = values
+    return {parent_id: SimpleNamespace(**values) for parent_id, values in result.items()}
+
+
+def attach_translations(db_session: Session, objects: list, language_code: Optional[str] = None,
+                        relationship: str = 'translations', attribute: str = 'translation') -> list:
+    """ Sets `attribute` of every object to its resolved translation (None when there is none),
+    without loading the `relationship` collection """
+    if not objects:
+        return objects
+    translation_model = inspect(type(objects[0])).relationships[relationship].mapper.class_
+    translations = resolve_translations(db_session, translation_model, [obj.id for obj in objects], language_code)
+    for obj in objects:
+        setattr(obj, attribute, translations.get(obj.id))
+    return objects
+
+
+def _language_rank(language_column, language_ids: list[int]):
+    return case({language_id: index for index, language_id in enumerate(language_ids)}, value=language_column,
+                else_=len(language_ids))
+
+
+def preferred_translation_stmt(translation_model, language_ids: list[int], parent_ids: Optional[Iterable] = None):
+    """ Exactly one translation per parent, picked in SQL with DISTINCT ON (parent) by the language_ids order
+    (see language_preference). Parents without any translation are missing from the result """
+    parent = parent_column(translation_model)
+    stmt = select(translation_model).distinct(parent).order_by(
+        parent, _language_rank(translation_model.language_id, language_ids), translation_model.id)
+    if parent_ids is not None:
+        stmt = stmt.where(parent.in_(list(parent_ids)))
+    return stmt
+
+
+def preferred_translation(relationship, language_ids: list[int], loader=selectinload):
+    """ Loader option filling the translations collection with the single preferred translation:
+
+    select(Course).options(preferred_translation(Course.translations, language_preference(db_session, 'ru')))
+
+    The collection is partial afterwards, use it for reading only.
+    """
+    translation_model = relationship.property.mapper.class_
+    parent = parent_column(translation_model)
+    other = aliased(translation_model)
+    other_parent = getattr(other, parent.key)
+    best = select(other.id).where(other_parent == parent).order_by(
+        _language_rank(other.language_id, language_ids), other.id).limit(1).scalar_subquery()
+    return loader(relationship.and_(translation_model.id == best))
@@ -0,0 +1,50 @@
+import re
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import func, literal, or_, select, union_all
+from sqlalchemy.orm import Session, joinedload
+
+from api.v1.models import User, UserTranslation
+
+NAME_COLUMNS = (UserTranslation.first_name, UserTranslation.last_name, UserTranslation.short_name)
+
+
+def _matches(column, text: str):
+    """ Substring match or a word similar to the text (typos), both served by the gin_trgm_ops index """
+    return or_(column.icontains(text, autoescape=True), literal(text).op('<%')(column))
+
+
+def _score(*columns, text: str):
+    return func.greatest(*(func.coalesce(func.word_similarity(text, column), 0) for column in columns))
+
+
+def user_search_stmt(text: str, organization_id: Optional[UUID] = None, limit: int = 20):
+    """ Users whose name, email or phone matches the text, best matches first, with translations joined """
+    text = text.strip()
+    by_name = select(UserTranslation.user_id, _score(*NAME_COLUMNS, text=text).label('score')) \
+        .where(or_(*(_matches(column, text) for column in NAME_COLUMNS)))
+    contact_filters = [_matches(User.email, text)]
+    digits = re.sub(r'\D', '', text)
+    if len(digits) >= 3:
+        # phones are stored as digits only (998XXXXXXXXX), so "90 123-45" has to match "99890123..."
+        contact_filters.append(User.phone.contains(digits, autoescape=True))
+    by_contact = select(User.id.label('user_id'), _score(User.email, User.phone, text=text).label('score')) \
+        .where(or_(*contact_filters))
+    if organization_id is not None:
+        by_name = by_name.join(User, User.id == UserTranslation.user_id).where(User.organization_id == organization_id)
+        by_contact = by_contact.where(User.organization_id == organization_id)
+    matched = union_all(by_name, by_contact).subquery('matched')
+    scores = select(matched.c.user_id, func.max(matched.c.score).label('score')) \
+        .group_by(matched.c.user_id).order_by(func.max(matched.c.score).desc(), matched.c.user_id) \
+        .limit(limit).subquery('scores')
+    return select(User).join(scores, scores.c.user_id == User.id) \
+        .options(joinedload(User.translations)) \
+        .order_by(scores.c.score.desc(), User.id)
+
+
+def search_users(db_session: Session, text: str, organization_id: Optional[UUID] = None, limit: int = 20) -> list:
+    """ Short user cards (AUserShortSchema) for admin search, one query """
+    if not text or not text.strip():
+        return []
+    return db_session.execute(user_search_stmt(text, organization_id, limit)).scalars().unique().all()
@@ -1,5 +1,6 @@
 from .user_model import *
 from .course_model import *
+from .catalogue_model import *
 # from .media_model import *
 # from .payment_model import *
 # from .notification_model import *
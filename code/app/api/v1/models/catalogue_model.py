@@ -0,0 +1,162 @@
+import itertools
+import logging
+import threading
+import time
+
+import sqlalchemy as db
+from sqlalchemy import Enum, event, select
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from .course_model import (Course, CourseTranslation, CourseStatusEnum, DifficultyLevelEnum, Language,
+                           LinkCategoryCourse, LinkCourseTag)
+from .media_model import Media
+from .payment_model import Discount
+
+logger = logging.getLogger(__name__)
+
+# The view is created by migration 9c4e1f7a3b52. Kept out of BaseModel.metadata so neither
+# alembic autogenerate nor create_all try to manage it as a table.
+catalogue_metadata = db.MetaData()
+
+course_catalogue = db.Table(
+    'course_catalogue', catalogue_metadata,
+    db.Column('course_id', db.Integer, primary_key=True),
+    db.Column('language_id', db.Integer, primary_key=True),
+    db.Column('language_code', db.String),
+    db.Column('slug', db.String),
+    db.Column('title', db.String),
+    db.Column('sub_title', db.String),
+    db.Column('price', db.DECIMAL(precision=12, scale=2, asdecimal=False)),
+    db.Column('final_price', db.DECIMAL(precision=12, scale=2, asdecimal=False)),
+    db.Column('is_free', db.Boolean),
+    db.Column('level', Enum(DifficultyLevelEnum)),
+    db.Column('status', Enum(CourseStatusEnum)),
+    db.Column('is_active', db.Boolean),
+    db.Column('is_verified', db.Boolean),
+    db.Column('is_for_child', db.Boolean),
+    db.Column('organization_id', UUID),
+    db.Column('sort', db.Integer),
+    db.Column('banner_image_id', UUID),
+    db.Column('banner_image_path', db.String),
+    db.Column('category_ids', ARRAY(db.Integer)),
+    db.Column('tag_ids', ARRAY(db.Integer)),
+    db.Column('total_modules', db.Integer),
+    db.Column('total_lessons', db.Integer),
+    db.Column('total_homeworks', db.Integer),
+    db.Column('rating', db.Float),
+    db.Column('created_at', db.DateTime),
+)
+
+# model -> columns the view projects or joins on, changes of other columns leave the view as it is.
+# Module, lesson and rating changes reach the view through course_stats, see course_stats_after_flush_event
+CATALOGUE_SOURCES = {
+    Course: ('slug', 'price', 'is_free', 'level', 'status', 'is_active', 'is_verified', 'is_for_child',
+             'organization_id', 'sort', 'banner_image_id', 'discount_id', 'deleted_at'),
+    CourseTranslation: ('course_id', 'language_id', 'title', 'sub_title'),
+    Language: ('code',),
+    LinkCategoryCourse: ('course_id', 'category_id'),
+    LinkCourseTag: ('course_id', 'tag_id'),
+    Discount: ('is_active', 'is_archive', 'percent'),
+    Media: ('path',),
+}
+# rows of these models reach the view only once a course (translation) points at them
+REFERENCED_SOURCES = (Language, Discount, Media)
+
+
+def catalogue_stmt(language_code: str, category_id: int = None, tag_id: int = None,
+                   level: DifficultyLevelEnum = None, is_for_child: bool = None):
+    """ Active public courses of the catalogue in one language, served from the view alone """
+    stmt = select(course_catalogue).where(
+        course_catalogue.c.language_code == language_code,
+        course_catalogue.c.status == CourseStatusEnum.PUBLIC,
+        course_catalogue.c.is_active,
+    )
+    if category_id is not None:
+        stmt = stmt.where(course_catalogue.c.category_ids.contains([category_id]))
+    if tag_id is not None:
+        stmt = stmt.where(course_catalogue.c.tag_ids.contains([tag_id]))
+    if level is not None:
+        stmt = stmt.where(course_catalogue.c.level == level)
+    if is_for_child is not None:
+        stmt = stmt.where(course_catalogue.c.is_for_child == is_for_child)
+    return stmt
+
+
+def refresh_course_catalogue(concurrently: bool = True):
+    from db.session import engine
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if concurrently else ''}course_catalogue")
+
+
+class CatalogueRefresher:
+    """ Debounced view refresh in a background thread: changes committed within `delay` seconds share one refresh
+    and refreshes start at least `interval` seconds apart, so a busy site refreshes once per interval """
+
+    def __init__(self, delay: float, interval: float = 0):
+        self.delay = delay
+        self.interval = interval
+        self._timer = None
+        self._last_run = None
+        self._lock = threading.Lock()
+
+    def schedule(self):
+        with self._lock:
+            if self._timer is not None:
+                return
+            delay = self.delay
+            if self._last_run is not None:
+                delay = max(delay, self._last_run + self.interval - time.monotonic())
+            self._timer = threading.Timer(delay, self._run)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _run(self):
+        # changes committed while refreshing schedule the next run
+        with self._lock:
+            self._timer = None
+            self._last_run = time.monotonic()
+        try:
+            refresh_course_catalogue()
+        except Exception as e:
+            logger.error(f"Course catalogue refresh error: {e}")
+
+
+catalogue_refresher = CatalogueRefresher(delay=settings.catalogue_refresh_delay,
+                                         interval=settings.catalogue_refresh_interval)
+
+
+def mark_catalogue_changed(session: Session):
+    """ Refresh the view after the session commits, for changes written with Core statements """
+    session.info['catalogue_changed'] = True
+
+
+def _changes_catalogue(session, obj) -> bool:
+    columns = CATALOGUE_SOURCES.get(type(obj))
+    if columns is None:
+        return False
+    if obj in session.new:
+        return not isinstance(obj, REFERENCED_SOURCES)
+    if obj in session.deleted:
+        return True
+    state = db.inspect(obj)
+    return any(state.attrs[key].history.has_changes() for key in columns)
+
+
+@event.listens_for(Session, 'after_flush')
+def catalogue_after_flush_event(session, flush_context):
+    if any(_changes_catalogue(session, obj) for obj in itertools.chain(session.new, session.dirty, session.deleted)):
+        mark_catalogue_changed(session)
+
+
+@event.listens_for(Session, 'after_commit')
+def catalogue_after_commit_event(session):
+    if session.info.pop('catalogue_changed', False):
+        catalogue_refresher.schedule()
+
+
+@event.listens_for(Session, 'after_rollback')
+def catalogue_after_rollback_event(session):
+    session.info.pop('catalogue_changed', None)
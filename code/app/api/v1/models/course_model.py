@@ -1,22 +1,30 @@
+import datetime
 import enum
+import itertools
+import logging
 import uuid
 
 import sqlalchemy as db
 from fastapi import HTTPException
 from slugify import slugify
 from sqlalchemy import Enum, event, func, select, text
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, JSONB, TSVECTOR, insert as pg_insert
+from sqlalchemy.ext.asyncio import async_object_session
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.ext.hybrid import hybrid_property
-from sqlalchemy.orm import relationship, validates, backref, object_session
+from sqlalchemy.orm import relationship, validates, backref, object_session, Session, deferred
 from sqlalchemy_utils import URLType
 
 from api.v1.exceptions import CustomValidationError
 from core.babel_config import _
+from core.config import settings
+from utils.cache import LRUCache
 from .base_model import BaseModel, base_validate_positive
 from .media_model import Media
 from .payment_model import Discount
 
+logger = logging.getLogger(__name__)
+
 
 class BaseCourseModel(BaseModel):
     __abstract__ = True
@@ -205,47 +213,119 @@ class Course(BaseCourseModel):
                            cascade="all,delete",
                            primaryjoin="and_(CourseReview.course_id==Course.id, CourseReview.is_verified==True)")
     user_purchases = relationship("UserPurchase", back_populates="course")
+    stats = relationship("CourseStats", uselist=False, lazy="joined", viewonly=True)
 
     __table_args__ = (db.CheckConstraint(price >= 0, name='check_price_valid'), {})
 
+    @property
+    def lessons_duration(self):
+        """ Sum of the lesson video durations, unlike the duration column which is filled in by hand """
+        return get_course_durations(object_session(self), self.id).total
+
     @hybrid_property
     def course_blocks(self):
         return {'course_about_block': self.course_about_block, 'course_whom_block': self.course_whom_block,
                 'course_learn_block': self.course_learn_block, 'course_plan_block': self.course_plan_block,
                 'student_work_block': self.course_students_work_block}
 
+    # values attached by load_course_stats() win, then the stats row (course_stats) joined to every course query,
+    # the aggregate queries are only a fallback
     @hybrid_property
     def total_modules(self) -> int:
-        db_session = object_session(self)
-        res = db_session.query(func.count(CourseModule.id)).where(CourseModule.course_id == self.id).filter_by(
-            is_active=True)
+        if '_preloaded_stats' in self.__dict__:
+            return self._preloaded_stats['total_modules']
+        if self.stats:
+            return self.stats.total_modules
+        res = object_session(self).execute(self._total_modules_stmt())
         return res.scalar() or 0
 
     @hybrid_property
     def total_lessons(self) -> int:
-        db_session = object_session(self)
-        stmt = db_session.query(
-            func.count(CourseLesson.id)
-        ).select_from(Course).where(Course.id == self.id).join(CourseModule).join(
-            CourseLesson).filter_by(is_active=True)
-        res = db_session.execute(stmt)
+        if '_preloaded_stats' in self.__dict__:
+            return self._preloaded_stats['total_lessons']
+        if self.stats:
+            return self.stats.total_lessons
+        res = object_session(self).execute(self._total_lessons_stmt())
         return res.scalar() or 0
 
     @hybrid_property
     def total_homeworks(self) -> int:
-        db_session = object_session(self)
-        stmt = db_session.query(func.count(CourseLesson.id)).select_from(CourseModule).where(
-            CourseModule.course_id == self.id).join(CourseLesson).filter_by(is_active=True, is_homework=True)
-        res = db_session.execute(stmt)
+        if '_preloaded_stats' in self.__dict__:
+            return self._preloaded_stats['total_homeworks']
+        if self.stats:
+            return self.stats.total_homeworks
+        res = object_session(self).execute(self._total_homeworks_stmt())
         return res.scalar() or 0
 
     @property
     def rating(self) -> float:
-        db_session = object_session(self)
-        stmt = db_session.query(func.avg(CourseRating.rating)).where(CourseRating.course_id == self.id)
-        res = db_session.execute(stmt)
+        if '_preloaded_stats' in self.__dict__:
+            return float(round(self._preloaded_stats['rating'], 1))
+        if self.stats:
+            return float(round(self.stats.rating, 1))
+        res = object_session(self).execute(self._rating_stmt())
         return float(round(res.scalar() or 0, 1))
 
+    # awaitable versions for objects loaded through an AsyncSession
+    async def _async_stats(self):
+        # the flush hook expires refreshed stats rows, attribute access would lazy load outside of the greenlet
+        stats = self.stats
+        if stats is not None and db.inspect(stats).expired_attributes:
+            await async_object_session(self).refresh(stats)
+        return stats
+
+    async def async_total_modules(self) -> int:
+        if '_preloaded_stats' in self.__dict__:
+            return self._preloaded_stats['total_modules']
+        stats = await self._async_stats()
+        if stats:
+            return stats.total_modules
+        res = await async_object_session(self).execute(self._total_modules_stmt())
+        return res.scalar() or 0
+
+    async def async_total_lessons(self) -> int:
+        if '_preloaded_stats' in self.__dict__:
+            return self._preloaded_stats['total_lessons']
+        stats = await self._async_stats()
+        if stats:
+            return stats.total_lessons
+        res = await async_object_session(self).execute(self._total_lessons_stmt())
+        return res.scalar() or 0
+
+    async def async_total_homeworks(self) -> int:
+        if '_preloaded_stats' in self.__dict__:
+            return self._preloaded_stats['total_homeworks']
+        stats = await self._async_stats()
+        if stats:
+            return stats.total_homeworks
+        res = await async_object_session(self).execute(self._total_homeworks_stmt())
+        return res.scalar() or 0
+
+    async def async_rating(self) -> float:
+        if '_preloaded_stats' in self.__dict__:
+            return float(round(self._preloaded_stats['rating'], 1))
+        stats = await self._async_stats()
+        if stats:
+            return float(round(stats.rating, 1))
+        res = await async_object_session(self).execute(self._rating_stmt())
+        return float(round(res.scalar() or 0, 1))
+
+    def _total_modules_stmt(self):
+        return select(func.count(CourseModule.id)).where(CourseModule.course_id == self.id,
+                                                         CourseModule.is_active == db.true())
+
+    def _total_lessons_stmt(self):
+        return select(func.count(CourseLesson.id)).select_from(CourseModule).join(CourseLesson).where(
+            CourseModule.course_id == self.id, CourseLesson.is_active == db.true())
+
+    def _total_homeworks_stmt(self):
+        return select(func.count(CourseLesson.id)).select_from(CourseModule).join(CourseLesson).where(
+            CourseModule.course_id == self.id, CourseLesson.is_active == db.true(),
+            CourseLesson.is_homework == db.true())
+
+    def _rating_stmt(self):
+        return select(func.avg(CourseRating.rating)).where(CourseRating.course_id == self.id)
+
 
 @event.listens_for(Course, 'before_insert')
 def course_before_insert_event(mapper, connect, target):
@@ -253,12 +333,22 @@ def course_before_insert_event(mapper, connect, target):
         target.slug = slugify(target.translations[0].title)
 
 
-class CourseTranslation(BaseCourseTranslationModel):
+class SearchableTranslationMixin:
+    """ search_vector is filled by the translation_search_vector_update() trigger, see api/v1/course/search.py """
+    desc = db.Column(db.String)
+
+    @declared_attr
+    def search_vector(cls):
+        return deferred(db.Column(TSVECTOR, server_default=db.FetchedValue(), server_onupdate=db.FetchedValue()))
+
+
+class CourseTranslation(SearchableTranslationMixin, BaseCourseTranslationModel):
     sub_title = db.Column(db.String)
     course_id = db.Column(db.Integer, db.ForeignKey("course.id", ondelete="CASCADE"), nullable=False)
 
     __table_args__ = (
         db.UniqueConstraint('course_id', 'language_id'),
+        db.Index('ix_course_translation_search_vector', 'search_vector', postgresql_using='gin'),
     )
 
 
@@ -295,6 +385,10 @@ class CourseModule(BaseCourseModel):
     def course_lesson_count(self):
         return len(self.course_lessons)
 
+    @property
+    def duration(self):
+        return get_course_durations(object_session(self), self.course_id).modules.get(self.id, 0)
+
     @hybrid_property
     def total_lessons(self):
         return sum([1 for lesson in self.course_lessons if lesson.is_active])
@@ -310,12 +404,13 @@ def course_module_before_insert_event(mapper, connect, target):
         target.slug = slugify(target.translations[0].title)
 
 
-class CourseModuleTranslation(BaseCourseTranslationModel):
+class CourseModuleTranslation(SearchableTranslationMixin, BaseCourseTranslationModel):
     content = db.Column(db.String)
     course_module_id = db.Column(db.Integer, db.ForeignKey("course_module.id", ondelete="CASCADE"), nullable=False)
 
     __table_args__ = (
         db.UniqueConstraint('course_module_id', 'language_id'),
+        db.Index('ix_course_module_translation_search_vector', 'search_vector', postgresql_using='gin'),
     )
 
 
@@ -329,6 +424,8 @@ class CourseLesson(BaseCourseModel):
     discount_id = db.Column(db.ForeignKey("discount.id"))
     lesson_id = db.Column(db.Integer)
     is_final = db.Column(db.Boolean, default=False, server_default=db.false())
+    # stable position of the lesson within the course, bit index in UserCourseProgress.learned
+    ordinal = db.Column(db.Integer)
 
     translations = relationship('CourseLessonTranslation', backref='translation', cascade="all,delete")
     promocodes = relationship("Promocode", secondary="link_course_lesson_promocode", back_populates="course_lessons",
@@ -356,13 +453,20 @@ class CourseLesson(BaseCourseModel):
                 'file_block': self.file_block,
                 'quiz_block': self.quiz_block}
 
+    # durations of all lessons of the course are computed together (see get_course_durations)
     @property
     def duration(self):
-        video_blocks_duration = object_session(self).query(func.sum(VideoBlock.duration)).where(
-            VideoBlock.course_lesson_id == self.id).scalar()
-        lesson_video_duration = object_session(self).query(func.sum(CourseLessonVideo.duration)).where(
-            CourseLessonVideo.course_lesson_id == self.id).scalar()
-        return video_blocks_duration or lesson_video_duration or 0
+        return get_course_durations(object_session(self), self.course_module.course_id).lessons.get(self.id, 0)
+
+    async def async_duration(self):
+        db_session = async_object_session(self)
+        course_module = self.__dict__.get('course_module')
+        if course_module is not None:
+            course_id = course_module.course_id
+        else:
+            stmt = select(CourseModule.course_id).where(CourseModule.id == self.course_module_id)
+            course_id = (await db_session.execute(stmt)).scalar()
+        return (await async_get_course_durations(db_session, course_id)).lessons.get(self.id, 0)
 
 
 @event.listens_for(CourseLesson, 'before_insert')
@@ -371,12 +475,104 @@ def course_lesson_before_insert_event(mapper, connect, target):
         target.slug = slugify(target.translations[0].title)
 
 
-class CourseLessonTranslation(BaseCourseTranslationModel):
+def _has_changes(obj, *keys) -> bool:
+    state = db.inspect(obj)
+    return any(state.attrs[key].history.has_changes() for key in keys)
+
+
+def _module_course_key(module):
+    """ Course id of the module, the course object while the course is not flushed yet """
+    if db.inspect(module).attrs.course.history.has_changes() and module.course is not None:
+        course = module.course
+        return course.id if course.id is not None else course
+    return module.course_id if module.course_id is not None else module.course
+
+
+def _new_module(session, lesson):
+    state = db.inspect(lesson)
+    if state.attrs.course_module_id.history.has_changes() and lesson.course_module_id is not None:
+        return session.get(CourseModule, lesson.course_module_id)
+    module = lesson.course_module
+    if module is None and lesson.course_module_id is not None:
+        module = session.get(CourseModule, lesson.course_module_id)
+    return module
+
+
+def _moved_lessons(session) -> dict:
+    """ Lessons ending up in another course (the lesson or its module moved) -> their new module """
+    moved, previous_modules = {}, {}
+    for obj in session.dirty:
+        if isinstance(obj, CourseLesson):
+            state = db.inspect(obj)
+            if state.attrs.course_module_id.history.has_changes() or state.attrs.course_module.history.has_changes():
+                history = state.attrs.course_module_id.history
+                previous_modules[obj] = (history.deleted or history.unchanged or [None])[0]
+        elif isinstance(obj, CourseModule) and obj.id is not None and _has_changes(obj, 'course_id', 'course'):
+            stmt = select(CourseLesson).where(CourseLesson.course_module_id == obj.id)
+            for lesson in session.execute(stmt).scalars():
+                previous_modules.setdefault(lesson, obj.id)
+    if not previous_modules:
+        return moved
+    # course of every previous module as stored, before this flush
+    stmt = select(CourseModule.id, CourseModule.course_id).where(
+        CourseModule.id.in_({module_id for module_id in previous_modules.values() if module_id is not None}))
+    previous_courses = dict(session.execute(stmt).all())
+    for lesson, module_id in previous_modules.items():
+        module = _new_module(session, lesson)
+        if module is not None and _module_course_key(module) != previous_courses.get(module_id):
+            moved[lesson] = module
+    return moved
+
+
+@event.listens_for(Session, 'before_flush')
+def course_lesson_ordinal_before_flush_event(session, flush_context, instances):
+    """ New lessons, and lessons moved into another course (by themselves or with their module), get the next
+    free ordinals of their course, ordinals are never reused or renumbered within a course.
+    The course rows are locked until commit (FOR NO KEY UPDATE) while the ordinals are assigned """
+    groups = {}
+    with session.no_autoflush:
+        lessons = {obj: _new_module(session, obj) for obj in session.new
+                   if isinstance(obj, CourseLesson) and obj.ordinal is None}
+        lessons.update(_moved_lessons(session))
+        if not lessons:
+            return
+        for lesson, module in lessons.items():
+            if module is None:
+                continue
+            # modules of a new course have no course_id yet, their lessons are grouped by the course object
+            key = _module_course_key(module)
+            if key is not None:
+                groups.setdefault(key, []).append(lesson)
+        course_ids = sorted(key for key in groups if isinstance(key, int))
+        if course_ids:
+            # concurrent inserts into one course wait here, so max + 1 is never handed out twice
+            session.execute(select(Course.id).where(Course.id.in_(course_ids)).order_by(Course.id)
+                            .with_for_update(key_share=True))
+        # moved lessons are still stored under their previous course, so they do not count here
+        stmt = select(CourseModule.course_id, func.max(CourseLesson.ordinal)) \
+            .join(CourseLesson, CourseLesson.course_module_id == CourseModule.id) \
+            .where(CourseModule.course_id.in_(course_ids)) \
+            .group_by(CourseModule.course_id)
+        last_ordinals = dict(session.execute(stmt).all()) if course_ids else {}
+    for key, course_lessons in groups.items():
+        start = last_ordinals.get(key)
+        start = 0 if start is None else start + 1
+        for ordinal, lesson in enumerate(sorted(course_lessons, key=_lesson_order), start):
+            lesson.ordinal = ordinal
+
+
+def _lesson_order(lesson):
+    # moved lessons keep their relative order, new ones follow in the order they were added
+    return lesson.ordinal is None, lesson.ordinal if lesson.ordinal is not None else 0
+
+
+class CourseLessonTranslation(SearchableTranslationMixin, BaseCourseTranslationModel):
     content = db.Column(db.String)
     course_lesson_id = db.Column(db.Integer, db.ForeignKey("course_lesson.id", ondelete="CASCADE"), nullable=False)
 
     __table_args__ = (
         db.UniqueConstraint('course_lesson_id', 'language_id'),
+        db.Index('ix_course_lesson_translation_search_vector', 'search_vector', postgresql_using='gin'),
     )
 
 
@@ -405,9 +601,37 @@ class UserLearnedCourseLesson(BaseModel):
 
     __table_args__ = (
         db.UniqueConstraint('user_id', 'course_lesson_id'),
+        db.Index('ix_user_learned_course_lesson_user_id_id', 'user_id', 'id'),
     )
 
 
+class UserCourseProgress(BaseModel):
+    """ Progress of a user in a course, one row instead of a UserLearnedCourseLesson row per lesson.
+
+    learned - bitmap indexed by CourseLesson.ordinal (bit n is bit n % 8 of byte n // 8, as get_bit/set_bit)
+    percents - learned percent per ordinal, percents[ordinal + 1] in SQL
+    """
+    user_id = db.Column(UUID, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey("course.id", ondelete="CASCADE"), nullable=False)
+    learned = db.Column(db.LargeBinary, nullable=False, default=b'', server_default=text("''::bytea"))
+    percents = db.Column(ARRAY(db.SmallInteger), nullable=False, default=list, server_default=text("'{}'"))
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'course_id'),
+    )
+
+    def is_learned(self, ordinal: int) -> bool:
+        byte = ordinal >> 3
+        return byte < len(self.learned) and bool(self.learned[byte] >> (ordinal & 7) & 1)
+
+    def percent(self, ordinal: int) -> int:
+        return (self.percents[ordinal] if ordinal < len(self.percents) else None) or 0
+
+    @property
+    def learned_count(self) -> int:
+        return sum(bin(byte).count('1') for byte in self.learned)
+
+
 class CourseComment(BaseModel):
     created_by_id = db.Column(UUID, db.ForeignKey("user.id"), nullable=False)  # fk(user)
     course_id = db.Column(db.Integer, db.ForeignKey("course.id"), nullable=False)
@@ -683,6 +907,135 @@ class CourseRating(BaseModel):
         raise HTTPException(400, _('Value should be from 1 to 5'))
 
 
+class CourseStats(BaseModel):
+    """ Precomputed course counters, kept up to date by course_stats_after_flush_event """
+    course_id = db.Column(db.Integer, db.ForeignKey("course.id", ondelete="CASCADE"), nullable=False, unique=True)
+    total_modules = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_lessons = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_homeworks = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating = db.Column(db.Float, nullable=False, default=0, server_default='0')
+
+
+def course_stats_select():
+    """ course_stats rows computed from the source tables, one per course """
+    total_modules = select(func.count(CourseModule.id)).where(
+        CourseModule.course_id == Course.id, CourseModule.is_active == db.true()).scalar_subquery()
+    lessons = select(func.count(CourseLesson.id)).select_from(CourseModule).join(CourseLesson).where(
+        CourseModule.course_id == Course.id, CourseLesson.is_active == db.true())
+    total_homeworks = lessons.where(CourseLesson.is_homework == db.true()).scalar_subquery()
+    ratings = select(func.count(CourseRating.id)).where(CourseRating.course_id == Course.id)
+    rating = select(func.coalesce(func.avg(CourseRating.rating), 0)).where(CourseRating.course_id == Course.id)
+    return select(Course.id, total_modules, lessons.scalar_subquery(), total_homeworks, ratings.scalar_subquery(),
+                  rating.scalar_subquery(), func.timezone('utc', func.now()))
+
+
+def refresh_course_stats(connection, course_ids=None, course_module_ids=None):
+    """ Recomputes course_stats of the given courses (and courses of the given modules), all courses by default.
+    Returns ids of the courses whose stats row was created or changed.
+
+    The course rows are locked (FOR NO KEY UPDATE, which does not block foreign key checks) before the
+    counters are recomputed, so concurrent writers to one course run one after another and the later one
+    counts the rows committed by the earlier one (READ COMMITTED takes a new snapshot per statement).
+    """
+    stmt = course_stats_select()
+    if course_ids is not None or course_module_ids is not None:
+        lock_stmt = select(Course.id).where(db.or_(
+            Course.id.in_(course_ids or []),
+            Course.id.in_(select(CourseModule.course_id).where(CourseModule.id.in_(course_module_ids or []))),
+        )).order_by(Course.id).with_for_update(key_share=True)
+        locked_ids = connection.execute(lock_stmt).scalars().all()
+        if not locked_ids:
+            return []
+        stmt = stmt.where(Course.id.in_(locked_ids))
+    table = CourseStats.__table__
+    insert_stmt = pg_insert(table).from_select(
+        ['course_id', 'total_modules', 'total_lessons', 'total_homeworks', 'rating_count', 'rating', 'created_at'],
+        stmt)
+    counters = ('total_modules', 'total_lessons', 'total_homeworks', 'rating_count', 'rating')
+    result = connection.execute(insert_stmt.on_conflict_do_update(
+        index_elements=[table.c.course_id],
+        set_={
+            **{key: insert_stmt.excluded[key] for key in counters},
+            'updated_at': insert_stmt.excluded.created_at,
+        },
+        where=db.tuple_(*(table.c[key] for key in counters)).is_distinct_from(
+            db.tuple_(*(insert_stmt.excluded[key] for key in counters))),
+    ).returning(table.c.course_id))
+    return result.scalars().all()
+
+
+def course_stats_stmts(course_ids) -> list:
+    """ Grouped statements computing the stats of many courses at once, rows start with course_id """
+    modules = select(CourseModule.course_id, func.count(CourseModule.id).label('total_modules')).where(
+        CourseModule.course_id.in_(course_ids), CourseModule.is_active == db.true()).group_by(CourseModule.course_id)
+    lessons = select(
+        CourseModule.course_id,
+        func.count(CourseLesson.id).label('total_lessons'),
+        func.count(CourseLesson.id).filter(CourseLesson.is_homework == db.true()).label('total_homeworks'),
+    ).select_from(CourseModule).join(CourseLesson).where(
+        CourseModule.course_id.in_(course_ids), CourseLesson.is_active == db.true()).group_by(CourseModule.course_id)
+    ratings = select(CourseRating.course_id, func.avg(CourseRating.rating).label('rating')).where(
+        CourseRating.course_id.in_(course_ids)).group_by(CourseRating.course_id)
+    return [modules, lessons, ratings]
+
+
+def _attach_course_stats(courses: list, results: list):
+    values = {}
+    for result in results:
+        for row in result.mappings():
+            values.setdefault(row['course_id'], {}).update(row)
+    for course in courses:
+        stats = {'total_modules': 0, 'total_lessons': 0, 'total_homeworks': 0, 'rating': 0}
+        stats.update({k: v or 0 for k, v in values.get(course.id, {}).items() if k != 'course_id'})
+        course._preloaded_stats = stats
+
+
+def load_course_stats(db_session, courses: list) -> list:
+    """ Computes stats of the courses without a course_stats row in one grouped query per counter, so
+    total_lessons, rating etc. of a list page do not query per course """
+    courses = [course for course in courses if course.stats is None and '_preloaded_stats' not in course.__dict__]
+    if courses:
+        course_ids = [course.id for course in courses]
+        _attach_course_stats(courses, [db_session.execute(stmt) for stmt in course_stats_stmts(course_ids)])
+    return courses
+
+
+async def async_load_course_stats(db_session, courses: list) -> list:
+    courses = [course for course in courses if course.stats is None and '_preloaded_stats' not in course.__dict__]
+    if courses:
+        course_ids = [course.id for course in courses]
+        _attach_course_stats(courses, [await db_session.execute(stmt) for stmt in course_stats_stmts(course_ids)])
+    return courses
+
+
+def _with_previous_value(obj, key) -> set:
+    history = db.inspect(obj).attrs[key].history
+    return {value for value in [getattr(obj, key), *history.deleted] if value is not None}
+
+
+@event.listens_for(Session, 'after_flush')
+def course_stats_after_flush_event(session, flush_context):
+    course_ids, course_module_ids = set(), set()
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, (CourseModule, CourseRating)):
+            course_ids |= _with_previous_value(obj, 'course_id')
+        elif isinstance(obj, CourseLesson):
+            course_module_ids |= _with_previous_value(obj, 'course_module_id')
+        elif isinstance(obj, Course) and obj in session.new:
+            course_ids.add(obj.id)
+    if course_ids or course_module_ids:
+        refreshed = set(refresh_course_stats(session.connection(), course_ids, course_module_ids))
+        # stats rows already loaded into the session (joined with their course) are stale now
+        for obj in list(session.identity_map.values()):
+            if isinstance(obj, CourseStats) and obj.course_id in refreshed:
+                session.expire(obj)
+        if refreshed:
+            # the catalogue view projects the counters and the rating
+            from .catalogue_model import mark_catalogue_changed
+            mark_catalogue_changed(session)
+
+
 # ========== Course Lesson contents ============
 
 class BaseCourseLessonBlock(BaseModel):
@@ -731,6 +1084,77 @@ class VideoBlock(BaseCourseLessonBlock):
     course_lesson = relationship("CourseLesson", backref=backref("video_block", cascade="all,delete"))
 
 
+class CourseDurations:
+    """ Video durations of one course: per lesson, rolled up per module and in total """
+
+    def __init__(self, rows):
+        self.lessons, self.modules = {}, {}
+        for lesson_id, course_module_id, video_blocks_duration, lesson_video_duration in rows:
+            duration = video_blocks_duration or lesson_video_duration or 0
+            self.lessons[lesson_id] = duration
+            self.modules[course_module_id] = self.modules.get(course_module_id, 0) + duration
+        self.total = sum(self.modules.values())
+
+
+course_duration_cache = LRUCache(maxsize=settings.course_duration_cache_size, ttl=settings.course_duration_cache_ttl)
+
+
+def course_durations_stmt(course_id):
+    video_blocks_duration = select(func.sum(VideoBlock.duration)).where(
+        VideoBlock.course_lesson_id == CourseLesson.id).scalar_subquery()
+    lesson_video_duration = select(func.sum(CourseLessonVideo.duration)).where(
+        CourseLessonVideo.course_lesson_id == CourseLesson.id).scalar_subquery()
+    return select(CourseLesson.id, CourseLesson.course_module_id, video_blocks_duration, lesson_video_duration) \
+        .join(CourseModule).where(CourseModule.course_id == course_id)
+
+
+def get_course_durations(db_session, course_id) -> CourseDurations:
+    """ One query for all lessons of the course, cached until a video of the course changes """
+    durations = course_duration_cache.get(course_id)
+    if durations is None:
+        durations = CourseDurations(db_session.execute(course_durations_stmt(course_id)).all())
+        course_duration_cache.set(course_id, durations)
+    return durations
+
+
+async def async_get_course_durations(db_session, course_id) -> CourseDurations:
+    durations = course_duration_cache.get(course_id)
+    if durations is None:
+        durations = CourseDurations((await db_session.execute(course_durations_stmt(course_id))).all())
+        course_duration_cache.set(course_id, durations)
+    return durations
+
+
+@event.listens_for(Session, 'after_flush')
+def course_duration_after_flush_event(session, flush_context):
+    course_ids, course_module_ids, course_lesson_ids = set(), set(), set()
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, (VideoBlock, CourseLessonVideo)):
+            course_lesson_ids |= _with_previous_value(obj, 'course_lesson_id')
+        elif isinstance(obj, CourseLesson):
+            course_module_ids |= _with_previous_value(obj, 'course_module_id')
+        elif isinstance(obj, CourseModule):
+            course_ids |= _with_previous_value(obj, 'course_id')
+    if course_module_ids or course_lesson_ids:
+        stmt = select(CourseModule.course_id).where(db.or_(
+            CourseModule.id.in_(course_module_ids),
+            CourseModule.id.in_(select(CourseLesson.course_module_id).where(CourseLesson.id.in_(course_lesson_ids))),
+        ))
+        course_ids |= set(session.connection().execute(stmt).scalars())
+    for course_id in course_ids:
+        course_duration_cache.delete(course_id)
+    # dropped again when the transaction ends: meanwhile other sessions could have cached the committed values
+    # and this one the uncommitted values
+    session.info.setdefault('course_duration_changed', set()).update(course_ids)
+
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def course_duration_after_transaction_event(session):
+    for course_id in session.info.pop('course_duration_changed', ()):
+        course_duration_cache.delete(course_id)
+
+
 class TextBlock(BaseCourseLessonBlock):
     course_lesson = relationship("CourseLesson", backref=backref("text_block", cascade="all,delete"))
     translations = relationship('TextBlockTranslation', backref='translation',
@@ -878,6 +1302,97 @@ class AnswerTranslation(BaseModel):
     )
 
 
+class QuizAttempt(BaseModel):
+    """ answers - {"<question_id>": [answer_id, ...]} for SINGLE/MULTIPLE, {"<question_id>": "text"} for OWN_ANSWER """
+    user_id = db.Column(UUID, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    quiz_block_id = db.Column(db.Integer, db.ForeignKey("quiz_block.id", ondelete="CASCADE"), nullable=False)
+    attempt_number = db.Column(db.Integer, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    submitted_at = db.Column(db.DateTime)
+    answers = db.Column(JSONB, nullable=False, default=dict, server_default=text("'{}'::jsonb"))
+    correct_count = db.Column(db.Integer)
+    errors_count = db.Column(db.Integer)
+    is_passed = db.Column(db.Boolean)
+    graded_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'quiz_block_id', 'attempt_number'),
+        db.Index('ix_quiz_attempt_quiz_block_id_id', 'quiz_block_id', 'id'),
+    )
+
+
+def _quiz_block_ids(session, question_ids: set, quiz_block_ids: set) -> set:
+    if question_ids:
+        stmt = select(LinkQuizBlockQuestion.quiz_block_id).where(LinkQuizBlockQuestion.question_id.in_(question_ids))
+        quiz_block_ids |= set(session.connection().execute(stmt).scalars())
+    return quiz_block_ids
+
+
+def _collection_ids(obj, key) -> set:
+    history = db.inspect(obj).attrs[key].history
+    return {item.id for item in itertools.chain(history.added, history.deleted) if item.id is not None}
+
+
+@event.listens_for(Session, 'before_flush')
+def quiz_answer_key_before_flush_event(session, flush_context, instances):
+    """ Link rows of deleted questions (and of questions of deleted answers) are cascaded away in the flush,
+    so their quizzes are resolved before it """
+    question_ids = set()
+    for obj in session.deleted:
+        if isinstance(obj, Question) and obj.id is not None:
+            question_ids.add(obj.id)
+        elif isinstance(obj, Answer):
+            question_ids |= _with_previous_value(obj, 'question_id')
+    if question_ids:
+        quiz_block_ids = _quiz_block_ids(session, question_ids, set())
+        if quiz_block_ids:
+            session.info.setdefault('quiz_answer_key_changed', set()).update(quiz_block_ids)
+
+
+@event.listens_for(Session, 'after_flush')
+def quiz_answer_key_after_flush_event(session, flush_context):
+    """ Quizzes whose answer key or pass threshold changed, their submitted attempts are regraded after commit """
+    question_ids, quiz_block_ids = set(), set()
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Answer):
+            if obj in session.dirty and not _has_changes(obj, 'is_correct', 'is_active', 'question_id'):
+                continue
+            question_ids |= _with_previous_value(obj, 'question_id')
+        elif isinstance(obj, Question):
+            if obj in session.dirty:
+                # links changed through the quiz_blocks collection, translations, sort etc. do not change grades
+                quiz_block_ids |= _collection_ids(obj, 'quiz_blocks')
+                if not _has_changes(obj, 'type', 'is_active'):
+                    continue
+            question_ids.add(obj.id)
+        elif isinstance(obj, LinkQuizBlockQuestion):
+            quiz_block_ids |= _with_previous_value(obj, 'quiz_block_id')
+        elif isinstance(obj, QuizBlock) and obj in session.dirty \
+                and _has_changes(obj, 'allowed_errors_count', 'questions'):
+            quiz_block_ids.add(obj.id)
+    quiz_block_ids = _quiz_block_ids(session, question_ids, quiz_block_ids)
+    if quiz_block_ids:
+        session.info.setdefault('quiz_answer_key_changed', set()).update(quiz_block_ids)
+
+
+@event.listens_for(Session, 'after_commit')
+def quiz_answer_key_after_commit_event(session):
+    quiz_block_ids = session.info.pop('quiz_answer_key_changed', None)
+    if quiz_block_ids:
+        from api.v1.celery_tasks import regrade_quiz
+        for quiz_block_id in quiz_block_ids:
+            # the data is committed already, a broker outage must not fail the commit
+            try:
+                regrade_quiz.delay(quiz_block_id)
+            except Exception as e:
+                logger.error(f"Quiz {quiz_block_id} regrade scheduling error: {e}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def quiz_answer_key_after_rollback_event(session):
+    session.info.pop('quiz_answer_key_changed', None)
+
+
 # between filter by created_at
 # https://stackoverflow.com/questions/33826441/return-average-of-counts-of-records-after-a-group-by-statement
 
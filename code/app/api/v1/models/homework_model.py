@@ -43,6 +43,7 @@ class Homework(BaseModel):
     __table_args__ = (
         db.CheckConstraint(sort > 0, name='check_sort_positive'),
         db.UniqueConstraint('course_lesson_id', 'student_id'),
+        db.Index('ix_homework_student_id_id', 'student_id', 'id'),
     )
 
     @validates('sort')
@@ -20,6 +20,10 @@ class Notification(BaseModel):
     receiver = relationship("User", back_populates="notifications",
                             foreign_keys=[receiver_id])
 
+    __table_args__ = (
+        db.Index('ix_notification_receiver_id_id', 'receiver_id', 'id'),
+    )
+
 
 class SmsStatusEnum(str, enum.Enum):
     SUCCESS = 'success'
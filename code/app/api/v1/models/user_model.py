@@ -72,6 +72,12 @@ class User(BaseModel):
 
     __table_args__ = (
         db.CheckConstraint('num_nulls(email, phone) < 2', name="Email or phone required check"),
+        db.Index('ix_user_organization_id_id', 'organization_id', 'id'),
+        # pg_trgm indexes for substring and fuzzy search (api/v1/helper/user_search.py)
+        db.Index('ix_user_email_trgm', 'email', postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'}),
+        db.Index('ix_user_phone_trgm', 'phone', postgresql_using='gin', postgresql_ops={'phone': 'gin_trgm_ops'}),
+        # emails are stored as entered, case insensitive lookups (api/v1/course/enrollment.py)
+        db.Index('ix_user_email_lower', db.func.lower(db.text('email'))),
     )
     user_first_name = association_proxy('translations', 'first_name')
     user_last_name = association_proxy('translations', 'last_name')
@@ -174,6 +180,12 @@ class UserTranslation(BaseModel):
     language = relationship("Language")
     __table_args__ = (
         db.UniqueConstraint('user_id', 'language_id'),
+        db.Index('ix_user_translation_first_name_trgm', 'first_name', postgresql_using='gin',
+                 postgresql_ops={'first_name': 'gin_trgm_ops'}),
+        db.Index('ix_user_translation_last_name_trgm', 'last_name', postgresql_using='gin',
+                 postgresql_ops={'last_name': 'gin_trgm_ops'}),
+        db.Index('ix_user_translation_short_name_trgm', 'short_name', postgresql_using='gin',
+                 postgresql_ops={'short_name': 'gin_trgm_ops'}),
     )
 
 
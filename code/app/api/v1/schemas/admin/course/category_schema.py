@@ -5,7 +5,7 @@ from typing import Optional, List, Union
 from fastapi import UploadFile
 
 from api.v1.schemas.admin.media.media_schema import AMediaReadSchema
-from api.v1.schemas.base_schema import ABaseModel, optional, BaseListResponseSchema
+from api.v1.schemas.base_schema import ABaseModel, optional, BaseListResponseSchema, BaseCursorListResponseSchema
 from pydantic import Field
 
 
@@ -67,3 +67,7 @@ class ACategoryReadSchema(ABaseCategorySchema):
 
 class AListResponseSchema(BaseListResponseSchema):
     results: List[ACategoryReadSchema]
+
+
+class ACursorListResponseSchema(BaseCursorListResponseSchema):
+    results: List[ACategoryReadSchema]
@@ -2,7 +2,7 @@ from datetime import datetime
 from typing import Optional, List
 from uuid import UUID
 
-from api.v1.schemas.base_schema import ABaseModel, optional, BaseListResponseSchema
+from api.v1.schemas.base_schema import ABaseModel, optional, BaseListResponseSchema, BaseCursorListResponseSchema
 from pydantic import Field
 
 from api.v1.schemas.data_types import DifficultyLevelEnum
@@ -55,6 +55,10 @@ class AListResponseSchema(BaseListResponseSchema):
     results: List[ACourseModuleReadSchema]
 
 
+class ACursorListResponseSchema(BaseCursorListResponseSchema):
+    results: List[ACourseModuleReadSchema]
+
+
 class ACourseModuleShortReadSchemaForUserPurchase(ABaseModel):
     id: int
     translations: List[ACourseModuleTranslationSchema]
@@ -2,9 +2,11 @@ from datetime import datetime
 from typing import Optional, List
 from uuid import UUID
 
-from pydantic import Field, AnyHttpUrl
+from pydantic import Field, AnyHttpUrl, validator
+from sqlalchemy.orm import object_session
 
-from api.v1.schemas.base_schema import ABaseModel, optional, BaseListResponseSchema
+from api.v1.models.course_model import Course, load_course_stats
+from api.v1.schemas.base_schema import ABaseModel, optional, BaseListResponseSchema, BaseCursorListResponseSchema
 from api.v1.schemas.admin.course.category_schema import ACategoryReadSchema
 from api.v1.schemas.admin.course.course_module_schema import ACourseModuleReadSchema
 from api.v1.schemas.admin.course.tag_schema import ATagReadSchema
@@ -74,23 +76,51 @@ class ACourseReadSchema(ABaseCourseSchema):
 
 class ACourseShortReadSchema(ABaseCourseSchema):
     id: int
+    total_modules: Optional[int]
+    total_lessons: Optional[int]
+    total_homeworks: Optional[int]
+    rating: Optional[float]
 
     class Config:
         orm_mode = True
 
 
+def preload_course_stats(results):
+    courses = [course for course in results if isinstance(course, Course)]
+    db_session = object_session(courses[0]) if courses else None
+    if db_session is not None:
+        load_course_stats(db_session, courses)
+    return results
+
+
 class AListResponseSchema(BaseListResponseSchema):
     results: List[ACourseShortReadSchema]
 
+    _preload_stats = validator('results', pre=True, allow_reuse=True)(preload_course_stats)
+
+
+class ACursorListResponseSchema(BaseCursorListResponseSchema):
+    results: List[ACourseShortReadSchema]
+
+    _preload_stats = validator('results', pre=True, allow_reuse=True)(preload_course_stats)
+
 
 class ACourseCuratorsListResponseSchema(BaseListResponseSchema):
     results: List[AUserShortSchema]
 
 
+class ACourseCuratorsCursorListResponseSchema(BaseCursorListResponseSchema):
+    results: List[AUserShortSchema]
+
+
 class ACourseAccessListResponseSchema(BaseListResponseSchema):
     results: List[AUserShortSchema]
 
 
+class ACourseAccessCursorListResponseSchema(BaseCursorListResponseSchema):
+    results: List[AUserShortSchema]
+
+
 class ACourseShortReadSchemaOnlyI18n(ABaseModel):
     id: int
     translations: List[ACourseTranslationSchema]
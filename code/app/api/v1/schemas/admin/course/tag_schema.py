@@ -3,7 +3,7 @@ from typing import List, Optional
 
 from pydantic import Field
 
-from api.v1.schemas.base_schema import ABaseModel, optional, BaseListResponseSchema
+from api.v1.schemas.base_schema import ABaseModel, optional, BaseListResponseSchema, BaseCursorListResponseSchema
 
 
 class ABaseTagSchema(ABaseModel):
@@ -32,3 +32,7 @@ class ATagReadSchema(ABaseTagSchema):
 
 class AListResponseSchema(BaseListResponseSchema):
     results: List[ATagReadSchema]
+
+
+class ACursorListResponseSchema(BaseCursorListResponseSchema):
+    results: List[ATagReadSchema]
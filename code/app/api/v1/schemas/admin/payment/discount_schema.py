@@ -4,7 +4,7 @@ from uuid import UUID
 
 from pydantic import Field
 
-from api.v1.schemas.base_schema import ABaseModel, optional, BaseListResponseSchema
+from api.v1.schemas.base_schema import ABaseModel, optional, BaseListResponseSchema, BaseCursorListResponseSchema
 
 
 class ADiscountTranslationSchema(ABaseModel):
@@ -47,3 +47,7 @@ class ADiscountReadSchema(ABaseDiscountSchema):
 
 class AListResponseSchema(BaseListResponseSchema):
     results: List[ADiscountReadSchema]
+
+
+class ACursorListResponseSchema(BaseCursorListResponseSchema):
+    results: List[ADiscountReadSchema]
@@ -5,7 +5,7 @@ from pydantic import Field
 from pydantic.networks import AnyHttpUrl
 
 from api.v1.schemas.admin.course.course_schema import ACourseShortReadSchemaOnlyI18n
-from api.v1.schemas.base_schema import ABaseModel, optional, BaseListResponseSchema
+from api.v1.schemas.base_schema import ABaseModel, optional, BaseListResponseSchema, BaseCursorListResponseSchema
 from api.v1.schemas.admin.media.media_schema import AMediaReadSchema
 from api.v1.schemas.admin.user.district_schema import ADistrictReadSchema
 from api.v1.schemas.admin.user.region_schema import ARegionShortReadSchema
@@ -73,5 +73,9 @@ class AListResponseSchema(BaseListResponseSchema):
     results: List[AOrganizationReadSchema]
 
 
+class ACursorListResponseSchema(BaseCursorListResponseSchema):
+    results: List[AOrganizationReadSchema]
+
+
 class AOrganizationReadSchemaWithCourses(AOrganizationReadSchema):
     allowed_courses: list[ACourseShortReadSchemaOnlyI18n]
@@ -4,7 +4,7 @@ from uuid import UUID
 
 from pydantic import BaseModel, Field
 
-from api.v1.schemas.base_schema import ABaseModel, optional, BaseListResponseSchema
+from api.v1.schemas.base_schema import ABaseModel, optional, BaseListResponseSchema, BaseCursorListResponseSchema
 
 
 class ABasePermissionSchema(ABaseModel):
@@ -41,3 +41,7 @@ class APermissionReadShortSchema(BaseModel):
 
 class AListResponseSchema(BaseListResponseSchema):
     results: List[APermissionReadSchema]
+
+
+class ACursorListResponseSchema(BaseCursorListResponseSchema):
+    results: List[APermissionReadSchema]
@@ -8,7 +8,7 @@ from api.v1.exceptions import CustomValidationError
 from api.v1.schemas.admin.media.media_schema import AMediaReadSchema
 from api.v1.schemas.admin.user.permission_schema import APermissionReadShortSchema
 from api.v1.schemas.admin.user.role_schema import ARoleReadSchemaForUserGet
-from api.v1.schemas.base_schema import ABaseModel, optional, BaseListResponseSchema
+from api.v1.schemas.base_schema import ABaseModel, optional, BaseListResponseSchema, BaseCursorListResponseSchema
 from api.v1.schemas.data_types import PhoneStr, GenderStatusEnum, PasswordStr
 
 
@@ -103,10 +103,18 @@ class AListResponseSchema(BaseListResponseSchema):
     results: List[AUserReadSchema]
 
 
+class ACursorListResponseSchema(BaseCursorListResponseSchema):
+    results: List[AUserReadSchema]
+
+
 class AListResponseShortSchema(BaseListResponseSchema):
     results: List[AUserShortSchema]
 
 
+class ACursorListResponseShortSchema(BaseCursorListResponseSchema):
+    results: List[AUserShortSchema]
+
+
 class ANotificationReadSchema(ABaseModel):
     sender: AUserShortSchema
     content: str
@@ -130,3 +138,7 @@ class AUserChangePasswordSchema(BaseModel):
 
 class ACourseStudentListResponseSchema(BaseListResponseSchema):
     results: List[AUserShortSchema]
+
+
+class ACourseStudentCursorListResponseSchema(BaseCursorListResponseSchema):
+    results: List[AUserShortSchema]
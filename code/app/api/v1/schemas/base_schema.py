@@ -80,3 +80,10 @@ class BaseListResponseSchema(BaseModel):
     page_size: int
     num_pages: int
     total_results: int
+    is_total_exact: bool = True
+
+
+class BaseCursorListResponseSchema(BaseModel):
+    page_size: int
+    next_cursor: Optional[str]
+    has_more: bool
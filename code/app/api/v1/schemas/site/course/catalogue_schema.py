@@ -0,0 +1,33 @@
+from typing import Optional, List
+from uuid import UUID
+
+from api.v1.schemas.base_schema import IBaseModel, BaseCursorListResponseSchema
+from api.v1.schemas.data_types import DifficultyLevelEnum
+
+
+class ICatalogueCourseSchema(IBaseModel):
+    course_id: int
+    language_id: int
+    slug: str
+    title: str
+    sub_title: Optional[str]
+    price: float
+    final_price: float
+    is_free: Optional[bool]
+    level: Optional[DifficultyLevelEnum]
+    is_for_child: Optional[bool]
+    banner_image_id: Optional[UUID]
+    banner_image_path: Optional[str]
+    category_ids: List[int]
+    tag_ids: List[int]
+    total_modules: int
+    total_lessons: int
+    total_homeworks: int
+    rating: float
+
+    class Config:
+        orm_mode = True
+
+
+class ICatalogueCursorListResponseSchema(BaseCursorListResponseSchema):
+    results: List[ICatalogueCourseSchema]
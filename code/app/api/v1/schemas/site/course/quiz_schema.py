@@ -0,0 +1,29 @@
+from typing import List, Optional
+
+from api.v1.models import QuestionTypeEnum, QuizBlockTypeEnum
+from api.v1.schemas.base_schema import IBaseModel
+
+
+class IQuizAnswerSchema(IBaseModel):
+    id: int
+    sort: Optional[int]
+    title: Optional[str]
+    is_correct: Optional[bool]
+
+
+class IQuizQuestionSchema(IBaseModel):
+    id: int
+    type: QuestionTypeEnum
+    title: Optional[str]
+    content: Optional[str]
+    answers: List[IQuizAnswerSchema]
+
+
+class IQuizSchema(IBaseModel):
+    id: int
+    language: str
+    quiz_type: QuizBlockTypeEnum
+    allowed_attempts: Optional[int]
+    fixed_seconds: Optional[int]
+    allowed_errors_count: Optional[int]
+    questions: List[IQuizQuestionSchema]
@@ -0,0 +1,17 @@
+from typing import List, Optional
+
+from api.v1.schemas.base_schema import IBaseModel, BaseListResponseSchema
+
+
+class ICourseSearchHitSchema(IBaseModel):
+    type: str
+    id: int
+    course_id: int
+    title: str
+    title_highlight: str
+    desc_highlight: Optional[str]
+    rank: float
+
+
+class ICourseSearchListResponseSchema(BaseListResponseSchema):
+    results: List[ICourseSearchHitSchema]
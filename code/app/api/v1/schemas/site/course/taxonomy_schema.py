@@ -0,0 +1,28 @@
+from typing import List, Optional
+
+from api.v1.schemas.base_schema import IBaseModel
+
+
+class ITaxonomyNodeSchema(IBaseModel):
+    id: int
+    slug: str
+    sort: Optional[int]
+    title: Optional[str]
+    desc: Optional[str]
+
+
+class ITaxonomyCategorySchema(ITaxonomyNodeSchema):
+    logo_path: Optional[str]
+
+
+class ITaxonomyTopicSchema(ITaxonomyNodeSchema):
+    categories: List[ITaxonomyCategorySchema]
+
+
+class ITaxonomyProfessionSchema(ITaxonomyNodeSchema):
+    topics: List[ITaxonomyTopicSchema]
+
+
+class ITaxonomySchema(IBaseModel):
+    language: str
+    professions: List[ITaxonomyProfessionSchema]
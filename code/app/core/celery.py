@@ -3,8 +3,8 @@ from core.config import settings
 
 celery = Celery(
     "async_task",
-    broker=f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}",
-    backend=f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}",
+    broker=settings.redis_url,
+    backend=settings.redis_url,
     # backend=settings.SYNC_CELERY_DATABASE_URI,
     include=["app.api.v1.celery_tasks"],  # route where tasks are defined
 )
@@ -12,4 +12,10 @@ celery = Celery(
 
 # celery.config_from_object(settings, namespace='CELERY')
 # celery.conf.update({"beat_dburi": settings.SYNC_CELERY_BEAT_DATABASE_URI})
+celery.conf.beat_schedule = {
+    "flush-lesson-progress": {
+        "task": "tasks.flush_lesson_progress",
+        "schedule": settings.progress_flush_interval,
+    },
+}
 celery.autodiscover_tasks()
@@ -84,6 +84,166 @@ class Settings:
     def database_pass(self) -> str:
         return self.__database_pass
 
+    @property
+    def database_pool_size(self) -> int:
+        return int(self.__database_pool_size)
+
+    @property
+    def database_max_overflow(self) -> int:
+        return int(self.__database_max_overflow)
+
+    @property
+    def database_pool_recycle(self) -> int:
+        return int(self.__database_pool_recycle)
+
+    @property
+    def database_pool_timeout(self) -> float:
+        return float(self.__database_pool_timeout)
+
+    @property
+    def database_pool_pre_ping(self) -> bool:
+        return str(self.__database_pool_pre_ping).lower() in ('1', 'true', 'yes')
+
+    @property
+    def internal_endpoints_enabled(self) -> bool:
+        return str(self.__internal_endpoints_enabled).lower() in ('1', 'true', 'yes')
+
+    @property
+    def internal_api_token(self) -> str:
+        return self.__internal_api_token
+
+    @property
+    def database_replica_hosts(self) -> list[str]:
+        return [host.strip() for host in (self.__database_replica_hosts or '').split(',') if host.strip()]
+
+    @property
+    def database_replica_balancer(self) -> str:
+        return self.__database_replica_balancer
+
+    @property
+    def database_read_your_writes_seconds(self) -> float:
+        return float(self.__database_read_your_writes_seconds)
+
+    @property
+    def sql_query_budget(self) -> int:
+        return int(self.__sql_query_budget)
+
+    @property
+    def sql_query_budget_strict(self) -> bool:
+        return str(self.__sql_query_budget_strict).lower() in ('1', 'true', 'yes')
+
+    @property
+    def sql_n_plus_one_threshold(self) -> int:
+        return int(self.__sql_n_plus_one_threshold)
+
+    @property
+    def slow_query_log_enabled(self) -> bool:
+        return str(self.__slow_query_log_enabled).lower() in ('1', 'true', 'yes')
+
+    @property
+    def slow_query_threshold_ms(self) -> float:
+        return float(self.__slow_query_threshold_ms)
+
+    @property
+    def slow_query_explain(self) -> bool:
+        return str(self.__slow_query_explain).lower() in ('1', 'true', 'yes')
+
+    @property
+    def slow_query_buffer_size(self) -> int:
+        return int(self.__slow_query_buffer_size)
+
+    @property
+    def count_exact_threshold(self) -> int:
+        return int(self.__count_exact_threshold)
+
+    @property
+    def count_cache_size(self) -> int:
+        return int(self.__count_cache_size)
+
+    @property
+    def count_cache_ttl(self) -> int:
+        return int(self.__count_cache_ttl)
+
+    @property
+    def course_duration_cache_size(self) -> int:
+        return int(self.__course_duration_cache_size)
+
+    @property
+    def course_duration_cache_ttl(self) -> int:
+        return int(self.__course_duration_cache_ttl)
+
+    @property
+    def catalogue_refresh_delay(self) -> float:
+        return float(self.__catalogue_refresh_delay)
+
+    @property
+    def catalogue_refresh_interval(self) -> float:
+        return float(self.__catalogue_refresh_interval)
+
+    @property
+    def translation_cache_size(self) -> int:
+        return int(self.__translation_cache_size)
+
+    @property
+    def translation_language_cache_ttl(self) -> int:
+        return int(self.__translation_language_cache_ttl)
+
+    @property
+    def taxonomy_cache_ttl(self) -> int:
+        return int(self.__taxonomy_cache_ttl)
+
+    @property
+    def redis_host(self) -> str:
+        return self.__redis_host
+
+    @property
+    def redis_port(self) -> int:
+        return int(self.__redis_port)
+
+    @property
+    def redis_db(self) -> int:
+        return int(self.__redis_db)
+
+    @property
+    def redis_url(self) -> str:
+        return f"redis://{self.redis_host}:{self.redis_port}/{self.redis_db}"
+
+    @property
+    def progress_flush_interval(self) -> float:
+        return float(self.__progress_flush_interval)
+
+    @property
+    def progress_flush_batch_size(self) -> int:
+        return int(self.__progress_flush_batch_size)
+
+    @property
+    def progress_learned_percent(self) -> float:
+        return float(self.__progress_learned_percent)
+
+    @property
+    def lesson_position_cache_size(self) -> int:
+        return int(self.__lesson_position_cache_size)
+
+    @property
+    def lesson_position_cache_ttl(self) -> int:
+        return int(self.__lesson_position_cache_ttl)
+
+    @property
+    def access_cache_size(self) -> int:
+        return int(self.__access_cache_size)
+
+    @property
+    def access_cache_ttl(self) -> int:
+        return int(self.__access_cache_ttl)
+
+    @property
+    def quiz_time_grace_seconds(self) -> int:
+        return int(self.__quiz_time_grace_seconds)
+
+    @property
+    def quiz_payload_cache_size(self) -> int:
+        return int(self.__quiz_payload_cache_size)
+
     @property
     def srv_port(self) -> int:
         return int(self.__srv_port)
@@ -122,8 +282,54 @@ class Settings:
         self.__database_name = os.environ.get('DATABASE_NAME')
         self.__database_user_name = os.environ.get('DATABASE_USER')
         self.__database_pass = os.environ.get('DATABASE_PASSWORD')
+        self.__database_pool_size = os.environ.get('DATABASE_POOL_SIZE', 10)
+        self.__database_max_overflow = os.environ.get('DATABASE_MAX_OVERFLOW', 20)
+        self.__database_pool_recycle = os.environ.get('DATABASE_POOL_RECYCLE', 1800)
+        self.__database_pool_timeout = os.environ.get('DATABASE_POOL_TIMEOUT', 30)
+        self.__database_pool_pre_ping = os.environ.get('DATABASE_POOL_PRE_PING', True)
+        self.__internal_endpoints_enabled = os.environ.get('INTERNAL_ENDPOINTS_ENABLED', False)
+        self.__internal_api_token = os.environ.get('INTERNAL_API_TOKEN')
+        self.__database_replica_hosts = os.environ.get('DATABASE_REPLICA_HOSTS')
+        self.__database_replica_balancer = os.environ.get('DATABASE_REPLICA_BALANCER', 'round_robin')
+        self.__database_read_your_writes_seconds = os.environ.get('DATABASE_READ_YOUR_WRITES_SECONDS', 5)
+        self.__sql_query_budget = os.environ.get('SQL_QUERY_BUDGET', 0)
+        self.__sql_query_budget_strict = os.environ.get('SQL_QUERY_BUDGET_STRICT', False)
+        self.__sql_n_plus_one_threshold = os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 5)
+        self.__slow_query_log_enabled = os.environ.get('SLOW_QUERY_LOG_ENABLED', False)
+        self.__slow_query_threshold_ms = os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200)
+        self.__slow_query_explain = os.environ.get('SLOW_QUERY_EXPLAIN', True)
+        self.__slow_query_buffer_size = os.environ.get('SLOW_QUERY_BUFFER_SIZE', 100)
+        self.__count_exact_threshold = os.environ.get('COUNT_EXACT_THRESHOLD', 10000)
+        self.__count_cache_size = os.environ.get('COUNT_CACHE_SIZE', 4096)
+        self.__count_cache_ttl = os.environ.get('COUNT_CACHE_TTL', 60)
+        self.__course_duration_cache_size = os.environ.get('COURSE_DURATION_CACHE_SIZE', 1024)
+        self.__course_duration_cache_ttl = os.environ.get('COURSE_DURATION_CACHE_TTL', 300)
+        self.__catalogue_refresh_delay = os.environ.get('CATALOGUE_REFRESH_DELAY', 5)
+        self.__catalogue_refresh_interval = os.environ.get('CATALOGUE_REFRESH_INTERVAL', 60)
+        self.__translation_cache_size = os.environ.get('TRANSLATION_CACHE_SIZE', 10000)
+        self.__translation_language_cache_ttl = os.environ.get('TRANSLATION_LANGUAGE_CACHE_TTL', 300)
+        self.__taxonomy_cache_ttl = os.environ.get('TAXONOMY_CACHE_TTL', 300)
+        self.__redis_host = os.environ.get('REDIS_HOST', 'localhost')
+        self.__redis_port = os.environ.get('REDIS_PORT', 6379)
+        self.__redis_db = os.environ.get('REDIS_DB', 0)
+        self.__progress_flush_interval = os.environ.get('PROGRESS_FLUSH_INTERVAL', 10)
+        self.__progress_flush_batch_size = os.environ.get('PROGRESS_FLUSH_BATCH_SIZE', 1000)
+        self.__progress_learned_percent = os.environ.get('PROGRESS_LEARNED_PERCENT', 90)
+        self.__lesson_position_cache_size = os.environ.get('LESSON_POSITION_CACHE_SIZE', 10000)
+        self.__lesson_position_cache_ttl = os.environ.get('LESSON_POSITION_CACHE_TTL', 3600)
+        self.__access_cache_size = os.environ.get('ACCESS_CACHE_SIZE', 10000)
+        self.__access_cache_ttl = os.environ.get('ACCESS_CACHE_TTL', 300)
+        self.__quiz_time_grace_seconds = os.environ.get('QUIZ_TIME_GRACE_SECONDS', 5)
+        self.__quiz_payload_cache_size = os.environ.get('QUIZ_PAYLOAD_CACHE_SIZE', 2000)
 
 
 settings = Settings()
 
 DATABASE_URI = f"postgresql://{settings.database_user_name}:{settings.database_pass}@{settings.database_host}:{settings.database_port}/{settings.database_name}"
+ASYNC_DATABASE_URI = f"postgresql+asyncpg://{settings.database_user_name}:{settings.database_pass}@{settings.database_host}:{settings.database_port}/{settings.database_name}"
+
+# DATABASE_REPLICA_HOSTS=replica1:5432,replica2
+DATABASE_REPLICA_URIS = [
+    f"postgresql://{settings.database_user_name}:{settings.database_pass}@{host}/{settings.database_name}"
+    for host in (h if ':' in h else f"{h}:{settings.database_port}" for h in settings.database_replica_hosts)]
+ASYNC_DATABASE_REPLICA_URIS = [uri.replace("postgresql://", "postgresql+asyncpg://", 1) for uri in DATABASE_REPLICA_URIS]
@@ -0,0 +1,37 @@
+import argparse
+import sys
+
+from api.v1.course.transfer import export_courses, import_courses
+from api.v1.models.catalogue_model import refresh_course_catalogue
+from db.session import engine
+
+
+def main() -> None:
+    """ python -m db.course_transfer export courses.jsonl 1 2 3
+        python -m db.course_transfer import courses.jsonl <organization_id> <created_by_id>
+    """
+    parser = argparse.ArgumentParser(description="Export or import whole course trees as JSON Lines")
+    commands = parser.add_subparsers(dest='command', required=True)
+    export_parser = commands.add_parser('export')
+    export_parser.add_argument('file')
+    export_parser.add_argument('course_ids', nargs='+', type=int)
+    import_parser = commands.add_parser('import')
+    import_parser.add_argument('file')
+    import_parser.add_argument('organization_id')
+    import_parser.add_argument('created_by_id')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        with engine.connect() as connection, open(args.file, 'w', encoding='utf-8') as file:
+            file.writelines(export_courses(connection, args.course_ids))
+        print("Courses successfully exported!")
+    else:
+        with engine.begin() as connection, open(args.file, encoding='utf-8') as file:
+            course_ids = import_courses(connection, file, args.organization_id, args.created_by_id)
+        # the process exits right away, a debounced background refresh would never run
+        refresh_course_catalogue()
+        print(f"Courses successfully imported: {course_ids}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
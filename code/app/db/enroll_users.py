@@ -0,0 +1,32 @@
+import argparse
+import csv
+import sys
+
+from api.v1.course.enrollment import ENROLLMENT_TARGETS, enroll_users, read_identifiers_csv
+from db.session import SessionLocal
+
+
+def main() -> None:
+    """ python -m db.enroll_users course 12 employees.csv [--organization <organization_id>] > outcomes.csv """
+    parser = argparse.ArgumentParser(description="Grant access to a course, module or lesson to users from a CSV "
+                                                 "file of user ids, emails or phones")
+    parser.add_argument('target', choices=list(ENROLLMENT_TARGETS))
+    parser.add_argument('target_id', type=int)
+    parser.add_argument('file')
+    parser.add_argument('--organization', dest='organization_id')
+    args = parser.parse_args()
+
+    with open(args.file, 'rb') as file:
+        identifiers = read_identifiers_csv(file.read())
+    with SessionLocal() as db_session:
+        outcomes = enroll_users(db_session, identifiers, args.target, args.target_id, args.organization_id)
+        db_session.commit()
+
+    writer = csv.writer(sys.stdout)
+    writer.writerow(['identifier', 'user_id', 'status'])
+    for outcome in outcomes:
+        writer.writerow([outcome['identifier'], outcome['user_id'] or '', outcome['status'].value])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+import contextlib
+import functools
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST_RE = re.compile(r'\bIN\s*\((?:[^()]|\([^()]*\))*\)', re.IGNORECASE)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_PARAM_RE = re.compile(r'%\(\w+\)s|%s|\$\d+|:\w+|\?')
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACE_RE = re.compile(r'\s+')
+
+
+@functools.lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """ Normalized statement: literals and bound parameters replaced with '?', IN lists collapsed """
+    result = _STRING_RE.sub('?', statement)
+    result = _IN_LIST_RE.sub('IN (?)', result)
+    result = _PARAM_RE.sub('?', result)
+    result = _NUMBER_RE.sub('?', result)
+    return _SPACE_RE.sub(' ', result).strip()
+
+
+class QueryBudgetExceeded(AssertionError):
+    def __init__(self, stats: "QueryStats", budget: int):
+        self.stats = stats
+        self.budget = budget
+        repeated = "; ".join(f"{count}x {statement[:120]}" for statement, count in stats.repeated(2)[:5])
+        super().__init__(f"{stats.count} queries executed, budget is {budget}. Repeated: {repeated or '-'}")
+
+
+class QueryStats:
+    """ Statements executed within one request (or query_budget() block) """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def repeated(self, threshold: Optional[int] = None) -> list[tuple[str, int]]:
+        """ Statements executed at least `threshold` times - the usual sign of an N+1 pattern """
+        threshold = threshold or settings.sql_n_plus_one_threshold
+        return [(statement, count) for statement, count in self.fingerprints.most_common() if count >= threshold]
+
+    @property
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries"'
+
+
+query_stats: ContextVar[Optional[QueryStats]] = ContextVar('query_stats', default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_start_time'].pop()
+    stats = query_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+def instrument_engine(engine):
+    """ Count and time statements of the engine (pass async_engine.sync_engine for async engines) """
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+@contextlib.contextmanager
+def collect_queries():
+    stats = QueryStats()
+    token = query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        query_stats.reset(token)
+
+
+@contextlib.contextmanager
+def query_budget(max_queries: int):
+    """ Fails with QueryBudgetExceeded when the block runs more than `max_queries` statements.
+
+    with query_budget(5):
+        client.get('/api/v1/course/')
+    """
+    with collect_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        raise QueryBudgetExceeded(stats, max_queries)
+
+
+def report_request_queries(stats: QueryStats, path: str):
+    for statement, count in stats.repeated():
+        logger.warning("Possible N+1 on %s: %s executed %s times", path, statement, count)
+    budget = settings.sql_query_budget
+    if budget and stats.count > budget:
+        if settings.sql_query_budget_strict:
+            raise QueryBudgetExceeded(stats, budget)
+        logger.warning("%s executed %s queries, budget is %s", path, stats.count, budget)
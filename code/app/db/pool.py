@@ -0,0 +1,110 @@
+import threading
+import time
+
+from sqlalchemy import exc as sqla_exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from core.config import settings
+
+# upper bounds (in seconds) of the connection wait time histogram buckets
+WAIT_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class PoolStats:
+    """ Counters of a single pool, survives engine.dispose() because pools are looked up by logging name """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.connects = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_sum = 0.0
+        self.wait_buckets = [0] * (len(WAIT_TIME_BUCKETS) + 1)
+        self._lock = threading.Lock()
+
+    def observe_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def observe_wait(self, seconds: float, timed_out: bool = False):
+        index = next((i for i, bound in enumerate(WAIT_TIME_BUCKETS) if seconds <= bound), len(WAIT_TIME_BUCKETS))
+        with self._lock:
+            self.wait_count += 1
+            self.wait_sum += seconds
+            self.wait_buckets[index] += 1
+            if timed_out:
+                self.timeouts += 1
+
+    def as_dict(self, pool) -> dict:
+        with self._lock:
+            buckets, total = {}, 0
+            for bound, count in zip(WAIT_TIME_BUCKETS + (float('inf'),), self.wait_buckets):
+                total += count
+                buckets[f"le_{bound}"] = total
+            return {
+                "name": self.name,
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "connects": self.connects,
+                "timeouts": self.timeouts,
+                "wait_time": {"count": self.wait_count, "sum": round(self.wait_sum, 6), "buckets": buckets},
+            }
+
+
+_pool_stats: dict[str, PoolStats] = {}
+_pool_stats_lock = threading.Lock()
+
+
+def get_pool_stats(name: str) -> PoolStats:
+    with _pool_stats_lock:
+        if name not in _pool_stats:
+            _pool_stats[name] = PoolStats(name)
+        return _pool_stats[name]
+
+
+class _InstrumentedPoolMixin:
+    @property
+    def stats(self) -> PoolStats:
+        return get_pool_stats(self._orig_logging_name or "default")
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except sqla_exc.TimeoutError:
+            self.stats.observe_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.observe_wait(time.perf_counter() - started)
+        return connection
+
+    def _create_connection(self):
+        self.stats.observe_connect()
+        return super()._create_connection()
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(name: str, is_async: bool = False) -> dict:
+    """ create_engine() keyword arguments for the instrumented QueuePool configured from settings """
+    return dict(
+        poolclass=InstrumentedAsyncAdaptedQueuePool if is_async else InstrumentedQueuePool,
+        pool_logging_name=name,
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        pool_recycle=settings.database_pool_recycle,
+        pool_timeout=settings.database_pool_timeout,
+        pool_pre_ping=settings.database_pool_pre_ping,
+    )
+
+
+def collect_pool_stats(engines: dict) -> list[dict]:
+    return [pool_engine.pool.stats.as_dict(pool_engine.pool)
+            for pool_engine in engines.values() if isinstance(pool_engine.pool, _InstrumentedPoolMixin)]
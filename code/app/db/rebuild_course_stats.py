@@ -0,0 +1,13 @@
+from api.v1.models.course_model import refresh_course_stats
+from db.session import engine
+
+
+def rebuild_course_stats() -> None:
+    """ Recomputes course_stats of every course, e.g. after rows were changed outside of the ORM """
+    with engine.begin() as connection:
+        refresh_course_stats(connection)
+    print("Course stats successfully rebuilt!")
+
+
+if __name__ == '__main__':
+    rebuild_course_stats()
@@ -0,0 +1,113 @@
+import itertools
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from core.config import settings
+
+# set session.info[USE_PRIMARY] = True to keep every statement of a session on the primary
+USE_PRIMARY = 'use_primary'
+READ_YOUR_WRITES_COOKIE = 'db_last_write'
+
+
+class WriteMarker:
+    """ Holds the time of the last committed write of the current client (request) """
+
+    def __init__(self, last_write_at: Optional[float] = None):
+        self.last_write_at = last_write_at
+        self.changed = False
+
+    def mark(self):
+        self.last_write_at = time.time()
+        self.changed = True
+
+    @property
+    def is_recent(self) -> bool:
+        if self.last_write_at is None:
+            return False
+        return time.time() - self.last_write_at < settings.database_read_your_writes_seconds
+
+
+# mutable holder, so that commits made in the threadpool are seen by the request middleware
+write_marker: ContextVar[Optional[WriteMarker]] = ContextVar('write_marker', default=None)
+
+
+class RoundRobinBalancer:
+    def __init__(self):
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def choose(self, engines: list):
+        with self._lock:
+            return engines[next(self._counter) % len(engines)]
+
+
+class LeastLoadedBalancer:
+    @staticmethod
+    def choose(engines: list):
+        return min(engines, key=lambda replica: replica.pool.checkedout())
+
+
+BALANCERS = {
+    'round_robin': RoundRobinBalancer,
+    'least_loaded': LeastLoadedBalancer,
+}
+
+
+def get_balancer(name: Optional[str] = None):
+    return BALANCERS[name or settings.database_replica_balancer]()
+
+
+class RoutingSession(Session):
+    """ Sends read-only statements to a replica and everything else to the primary (session bind).
+
+    Reads stay on the primary once the session has flushed, during a flush, for SELECT ... FOR UPDATE
+    and within DATABASE_READ_YOUR_WRITES_SECONDS after a commit of the same client.
+    """
+
+    def __init__(self, replicas: Optional[list] = None, balancer=None, **kwargs):
+        super().__init__(**kwargs)
+        self.replicas = replicas or []
+        self.balancer = balancer or get_balancer()
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.replicas and self._is_replica_safe(clause):
+            return self.balancer.choose(self.replicas)
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+    def _is_replica_safe(self, clause) -> bool:
+        if clause is None or not clause.is_select or getattr(clause, '_for_update_arg', None) is not None:
+            return False
+        if self._flushing or self.info.get(USE_PRIMARY) or self.info.get('has_writes'):
+            return False
+        marker = write_marker.get()
+        return not (marker and marker.is_recent)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def routing_session_after_flush(session, flush_context):
+    session.info['has_writes'] = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def routing_session_do_orm_execute(orm_execute_state):
+    # insert/update/delete and textual statements executed directly through the session
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info['has_writes'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def routing_session_after_commit(session):
+    if session.info.pop('has_writes', False):
+        marker = write_marker.get()
+        if marker:
+            marker.mark()
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def routing_session_after_rollback(session):
+    session.info.pop('has_writes', None)
@@ -1,23 +1,72 @@
-from sqlalchemy import NullPool, create_engine
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
-from core.config import DATABASE_URI
+from core.config import settings, DATABASE_URI, ASYNC_DATABASE_URI, DATABASE_REPLICA_URIS, ASYNC_DATABASE_REPLICA_URIS
+from db.instrumentation import instrument_engine
+from db.pool import pool_options
+from db.routing import RoutingSession, get_balancer
+from db.slow_query import enable_slow_query_log
 
 
 engine = create_engine(
     DATABASE_URI,
     echo=False,
     future=True,
-    poolclass=NullPool
+    **pool_options("primary")
 )
 
+replica_engines = [
+    create_engine(uri, echo=False, future=True, **pool_options(f"replica_{index}"))
+    for index, uri in enumerate(DATABASE_REPLICA_URIS)
+]
+
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine,
+    class_=RoutingSession,
+    replicas=replica_engines,
+    balancer=get_balancer(),
     expire_on_commit=False,
 )
 
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URI,
+    echo=False,
+    future=True,
+    **pool_options("primary_async", is_async=True)
+)
+
+async_replica_engines = [
+    create_async_engine(uri, echo=False, future=True, **pool_options(f"replica_{index}_async", is_async=True))
+    for index, uri in enumerate(ASYNC_DATABASE_REPLICA_URIS)
+]
+
+AsyncSessionLocal = async_sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=async_engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    replicas=[replica.sync_engine for replica in async_replica_engines],
+    balancer=get_balancer(),
+    expire_on_commit=False,
+)
+
+engines = {
+    "primary": engine,
+    "primary_async": async_engine.sync_engine,
+    **{f"replica_{index}": replica for index, replica in enumerate(replica_engines)},
+    **{f"replica_{index}_async": replica.sync_engine for index, replica in enumerate(async_replica_engines)},
+}
+
+for instrumented_engine in engines.values():
+    instrument_engine(instrumented_engine)
+
+if settings.slow_query_log_enabled:
+    enable_slow_query_log(engines, explain_engine=engine)
+
 
 def get_db():
     db = SessionLocal()
@@ -25,3 +74,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,131 @@
+import datetime
+import logging
+import pathlib
+import re
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from sqlalchemy import event
+
+from core.config import settings
+from db.instrumentation import fingerprint
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = pathlib.Path(__file__).resolve().parents[1]
+_SKIPPED_DIRS = (str(APP_DIR / 'db'),)
+
+# statements EXPLAIN ANALYZE must not execute a second time: row locks would wait on the locks the original
+# transaction still holds, volatile functions would have side effects (sequence values, advisory locks)
+_NOT_ANALYZABLE = re.compile(
+    r"\bFOR\s+(NO\s+KEY\s+UPDATE|UPDATE|KEY\s+SHARE|SHARE)\b"
+    r"|\b(INSERT|UPDATE|DELETE|MERGE)\b"
+    r"|\b(nextval|setval|currval|lastval|random|gen_random_uuid|uuid_generate_v\d\w*|clock_timestamp|"
+    r"timeofday|txid_current|pg_sleep\w*|pg_\w*advisory\w*|pg_notify|pg_cancel_backend|pg_terminate_backend|"
+    r"set_config|dblink\w*)\s*\(",
+    re.IGNORECASE)
+
+
+def find_call_site() -> Optional[str]:
+    """ First application frame outside of db/ and the libraries, e.g. 'Course.total_lessons (course_model.py:225)' """
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(str(APP_DIR)) and not filename.startswith(_SKIPPED_DIRS):
+            name = getattr(frame.f_code, 'co_qualname', frame.f_code.co_name)
+            return f"{name} ({pathlib.Path(filename).relative_to(APP_DIR)}:{frame.f_lineno})"
+        frame = frame.f_back
+    return None
+
+
+def parameter_shapes(parameters, executemany: bool):
+    """ Types of the bound parameters without their values """
+    if executemany:
+        rows = list(parameters or [])
+        return {"rows": len(rows), "row": parameter_shapes(rows[0], False) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+class SlowQueryRecorder:
+    """ Keeps the last N statements slower than the threshold, EXPLAIN plans are captured in background """
+
+    def __init__(self, explain_engine=None, threshold_ms: Optional[float] = None, size: Optional[int] = None):
+        self.explain_engine = explain_engine
+        self.threshold = (threshold_ms if threshold_ms is not None else settings.slow_query_threshold_ms) / 1000
+        self.records = deque(maxlen=size or settings.slow_query_buffer_size)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slow-query-explain')
+
+    def attach(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('slow_query_start_time', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info['slow_query_start_time'].pop()
+        if duration < self.threshold or statement.lstrip()[:7].upper() == 'EXPLAIN':
+            return
+        record = {
+            "created_at": datetime.datetime.utcnow().isoformat(),
+            "duration_ms": round(duration * 1000, 2),
+            "statement": fingerprint(statement),
+            "parameters": parameter_shapes(parameters, executemany),
+            "call_site": find_call_site(),
+            "database": conn.engine.url.host,
+            "plan": None,
+        }
+        with self._lock:
+            self.records.append(record)
+        logger.warning("Slow query %.2f ms at %s: %s", record['duration_ms'], record['call_site'],
+                       record['statement'])
+        if self._can_explain(conn, statement, executemany):
+            self._executor.submit(self._explain, record, statement, parameters, self._can_analyze(statement))
+
+    def _can_explain(self, conn, statement: str, executemany: bool) -> bool:
+        if not settings.slow_query_explain or self.explain_engine is None or executemany:
+            return False
+        if conn.dialect.driver != self.explain_engine.dialect.driver:
+            return False
+        return statement.lstrip()[:6].upper() in ('SELECT', 'WITH ')
+
+    @staticmethod
+    def _can_analyze(statement: str) -> bool:
+        # EXPLAIN ANALYZE executes the statement, locking reads and volatile calls only get the estimated plan
+        return _NOT_ANALYZABLE.search(statement) is None
+
+    def _explain(self, record: dict, statement: str, parameters, analyze: bool = True):
+        options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+        try:
+            with self.explain_engine.connect() as conn:
+                conn.exec_driver_sql("SET LOCAL statement_timeout = 30000")
+                result = conn.exec_driver_sql(f"EXPLAIN ({options}) {statement}", parameters)
+                record["plan"] = result.scalar()
+                conn.rollback()
+        except Exception as e:
+            logger.error(f"Slow query EXPLAIN error: {e}")
+            record["plan"] = {"error": str(e)}
+
+    def as_list(self) -> list[dict]:
+        with self._lock:
+            return list(reversed(self.records))
+
+
+slow_query_recorder: Optional[SlowQueryRecorder] = None
+
+
+def enable_slow_query_log(engines: dict, explain_engine) -> SlowQueryRecorder:
+    global slow_query_recorder
+    slow_query_recorder = SlowQueryRecorder(explain_engine=explain_engine)
+    for recorded_engine in engines.values():
+        slow_query_recorder.attach(recorded_engine)
+    return slow_query_recorder
@@ -1,7 +1,45 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+
+from api.v1.endpoint import catalogue, internal, search, taxonomy
+from core.config import settings
+from db.instrumentation import collect_queries, report_request_queries
+from db.routing import READ_YOUR_WRITES_COOKIE, WriteMarker, write_marker
 
 app = FastAPI()
 
+app.include_router(catalogue.router, prefix='/api/v1/catalogue', tags=['catalogue'])
+app.include_router(search.router, prefix='/api/v1/search', tags=['search'])
+app.include_router(taxonomy.router, prefix='/api/v1/taxonomy', tags=['taxonomy'])
+if settings.internal_endpoints_enabled:
+    app.include_router(internal.router, prefix='/internal', tags=['internal'], include_in_schema=False)
+
+
+@app.middleware('http')
+async def read_your_writes_middleware(request: Request, call_next):
+    try:
+        last_write_at = float(request.cookies.get(READ_YOUR_WRITES_COOKIE))
+    except (TypeError, ValueError):
+        last_write_at = None
+    marker = WriteMarker(last_write_at)
+    token = write_marker.set(marker)
+    try:
+        response = await call_next(request)
+    finally:
+        write_marker.reset(token)
+    if marker.changed:
+        response.set_cookie(READ_YOUR_WRITES_COOKIE, str(marker.last_write_at),
+                            max_age=int(settings.database_read_your_writes_seconds) + 1, httponly=True)
+    return response
+
+
+@app.middleware('http')
+async def sql_instrumentation_middleware(request: Request, call_next):
+    with collect_queries() as stats:
+        response = await call_next(request)
+    response.headers['Server-Timing'] = stats.server_timing
+    report_request_queries(stats, request.url.path)
+    return response
+
 
 @app.get('/root')
 def root():
@@ -0,0 +1,96 @@
+import threading
+import time
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from api.v1.models import CourseLesson, CourseModule
+
+
+def ordinals(engine, lesson_ids) -> list:
+    with engine.connect() as connection:
+        stmt = sa.select(CourseLesson.id, CourseLesson.ordinal).where(CourseLesson.id.in_(lesson_ids))
+        return [dict(connection.execute(stmt).all())[lesson_id] for lesson_id in lesson_ids]
+
+
+def add_lesson(session, module_id, slug) -> CourseLesson:
+    lesson = CourseLesson(course_module_id=module_id, slug=slug)
+    session.add(lesson)
+    return lesson
+
+
+def test_new_lessons_continue_after_the_last_ordinal(db, make_course):
+    _, (module_id, _), lesson_ids = make_course([2, 1])
+    with Session(db) as session:
+        lessons = [add_lesson(session, module_id, 'new-1'), add_lesson(session, module_id, 'new-2')]
+        session.commit()
+        assert sorted(lesson.ordinal for lesson in lessons) == [3, 4]
+    assert ordinals(db, lesson_ids) == [0, 1, 2]
+
+
+def test_first_lesson_of_a_course_gets_zero(db, make_course):
+    _, (module_id,), _ = make_course([0])
+    with Session(db) as session:
+        lesson = add_lesson(session, module_id, 'first')
+        session.commit()
+        assert lesson.ordinal == 0
+
+
+def test_lesson_moved_to_another_course_gets_a_free_ordinal(db, make_course):
+    _, _, (moved_id, _) = make_course([2])
+    _, (target_module_id,), target_lesson_ids = make_course([3])
+    with Session(db) as session:
+        session.get(CourseLesson, moved_id).course_module_id = target_module_id
+        session.commit()
+    assert ordinals(db, [*target_lesson_ids, moved_id]) == [0, 1, 2, 3]
+
+
+def test_lesson_moved_through_the_relationship(db, make_course):
+    _, _, (moved_id,) = make_course([1])
+    _, (target_module_id,), _ = make_course([2])
+    with Session(db) as session:
+        lesson = session.get(CourseLesson, moved_id)
+        lesson.course_module = session.get(CourseModule, target_module_id)
+        session.commit()
+    assert ordinals(db, [moved_id]) == [2]
+
+
+def test_lesson_moved_within_its_course_keeps_the_ordinal(db, make_course):
+    _, (_, other_module_id), (moved_id, *_) = make_course([2, 1])
+    with Session(db) as session:
+        session.get(CourseLesson, moved_id).course_module_id = other_module_id
+        session.commit()
+    assert ordinals(db, [moved_id]) == [0]
+
+
+def test_module_moved_to_another_course_renumbers_its_lessons(db, make_course):
+    _, (moved_module_id, _), lesson_ids = make_course([2, 1])
+    target_course_id, _, target_lesson_ids = make_course([2])
+    with Session(db) as session:
+        session.get(CourseModule, moved_module_id).course_id = target_course_id
+        session.commit()
+    # the moved lessons keep their order after the lessons of the target course
+    assert ordinals(db, lesson_ids) == [2, 3, 2]
+    assert ordinals(db, target_lesson_ids) == [0, 1]
+
+
+def test_concurrent_inserts_into_one_course_get_distinct_ordinals(db, make_course):
+    _, (module_id,), _ = make_course([1])
+    results = {}
+
+    def insert_concurrently():
+        with Session(db) as session:
+            results['second'] = add_lesson(session, module_id, 'second')
+            session.commit()
+            results['second_ordinal'] = results['second'].ordinal
+
+    with Session(db) as session:
+        first = add_lesson(session, module_id, 'first')
+        session.flush()  # holds the course lock until commit
+        thread = threading.Thread(target=insert_concurrently)
+        thread.start()
+        time.sleep(0.5)
+        assert thread.is_alive(), 'the second insert must wait for the course lock'
+        session.commit()
+        thread.join(timeout=10)
+        assert {first.ordinal, results['second_ordinal']} == {1, 2}
@@ -0,0 +1,188 @@
+import logging
+
+import pytest
+import redis
+import sqlalchemy as sa
+
+from api.v1.course import progress_buffer
+from api.v1.course.progress_buffer import BUFFER_KEY, FLUSHING_KEY, buffered_progress, flush_progress
+from api.v1.models import UserCourseProgress, UserLearnedCourseLesson
+from db import session as db_session
+
+
+class FakeLock:
+    def __init__(self, client):
+        self.client = client
+
+    def acquire(self, blocking=True):
+        if self.client.locked:
+            return False
+        self.client.locked = True
+        return True
+
+    def release(self):
+        self.client.locked = False
+        if self.client.lock_expired:
+            raise redis.exceptions.LockNotOwnedError("Cannot release a lock that's no longer owned")
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.results = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def hmget(self, key, fields):
+        self.results.append([self.client.hashes.get(key, {}).get(field) for field in fields])
+
+    def execute(self):
+        return self.results
+
+
+class FakeRedis:
+    """ The hash, rename and lock commands the progress buffer uses, values are strings (decode_responses) """
+
+    def __init__(self):
+        self.hashes = {}
+        self.locked = False
+        self.lock_expired = False
+        self.repeat_fields = False
+
+    def lock(self, name, timeout=None):
+        return FakeLock(self)
+
+    def exists(self, key):
+        return int(key in self.hashes)
+
+    def rename(self, source, destination):
+        if source not in self.hashes:
+            raise redis.ResponseError('no such key')
+        self.hashes[destination] = self.hashes.pop(source)
+
+    def hscan_iter(self, key, count=None):
+        items = list(self.hashes.get(key, {}).items())
+        yield from items
+        if self.repeat_fields:
+            # HSCAN may return a field more than once while the hash is rehashed
+            yield from items
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def buffer(self, user_id, course_lesson_id, percent, key=BUFFER_KEY):
+        self.hashes.setdefault(key, {})[f'{user_id}:{course_lesson_id}'] = str(percent)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(progress_buffer, '_redis_client', client)
+    return client
+
+
+def test_flush_is_skipped_while_another_worker_holds_the_lock(client, monkeypatch):
+    client.locked = True
+    monkeypatch.setattr(progress_buffer, '_flush', lambda *args: pytest.fail('flushed without the lock'))
+    assert flush_progress() == 0
+
+
+def test_expired_lock_does_not_fail_a_finished_flush(client, monkeypatch, caplog):
+    client.lock_expired = True
+    monkeypatch.setattr(progress_buffer, '_flush', lambda *args: 3)
+    with caplog.at_level(logging.WARNING, logger=progress_buffer.__name__):
+        assert flush_progress() == 3
+    assert 'lock expired' in caplog.text
+    assert not client.locked
+
+
+def test_expired_lock_does_not_mask_a_flush_error(client, monkeypatch):
+    client.lock_expired = True
+
+    def failing_flush(*args):
+        raise RuntimeError('database is down')
+
+    monkeypatch.setattr(progress_buffer, '_flush', failing_flush)
+    with pytest.raises(RuntimeError, match='database is down'):
+        flush_progress()
+
+
+def test_buffered_progress_takes_the_highest_of_both_hashes(client):
+    client.buffer('user', 1, 30)
+    client.buffer('user', 1, 60, key=FLUSHING_KEY)
+    client.buffer('user', 2, 80)
+    assert buffered_progress('user', [1, 2, 3]) == {1: 60.0, 2: 80.0}
+
+
+@pytest.fixture
+def lessons(db, make_course, make_user, monkeypatch):
+    """ (user_id, course_id, [lesson_id, ...]) of a course of three lessons, flushes write to the test database """
+    monkeypatch.setattr(db_session, 'engine', db)
+    course_id, _, lesson_ids = make_course([3])
+    return make_user(), course_id, lesson_ids
+
+
+def stored_progress(engine, user_id) -> dict:
+    with engine.connect() as connection:
+        stmt = sa.select(UserLearnedCourseLesson.course_lesson_id, UserLearnedCourseLesson.learned_percent,
+                         UserLearnedCourseLesson.is_learned).where(UserLearnedCourseLesson.user_id == user_id)
+        return {lesson_id: (percent, is_learned) for lesson_id, percent, is_learned in connection.execute(stmt)}
+
+
+def course_progress(engine, user_id, course_id) -> UserCourseProgress:
+    with engine.connect() as connection:
+        row = connection.execute(sa.select(UserCourseProgress.learned, UserCourseProgress.percents).where(
+            UserCourseProgress.user_id == user_id, UserCourseProgress.course_id == course_id)).one()
+    return UserCourseProgress(learned=row.learned, percents=row.percents)
+
+
+def test_flush_moves_the_buffer_to_the_database(db, client, lessons):
+    user_id, course_id, (first, second, third) = lessons
+    client.buffer(user_id, first, 100)
+    client.buffer(user_id, third, 40)
+    client.repeat_fields = True
+    assert flush_progress(batch_size=1) == 2
+    assert stored_progress(db, user_id) == {first: (100, True), third: (40, False)}
+    progress = course_progress(db, user_id, course_id)
+    assert [progress.is_learned(ordinal) for ordinal in range(3)] == [True, False, False]
+    assert [progress.percent(ordinal) for ordinal in range(3)] == [100, 0, 40]
+    assert client.hashes == {}
+
+
+def test_flush_never_lowers_progress(db, client, lessons):
+    user_id, course_id, (first, *_) = lessons
+    client.buffer(user_id, first, 95)
+    flush_progress()
+    # a late heartbeat of an older position
+    client.buffer(user_id, first, 20)
+    flush_progress()
+    assert stored_progress(db, user_id) == {first: (95, True)}
+    assert course_progress(db, user_id, course_id).percent(0) == 95
+
+
+def test_failed_flush_is_retried_from_the_renamed_buffer(db, client, lessons, monkeypatch):
+    user_id, _, (first, second, _) = lessons
+    client.buffer(user_id, first, 50)
+    flush_batch = progress_buffer._flush_batch
+
+    def failing_batch(connection, batch):
+        raise RuntimeError('database is down')
+
+    monkeypatch.setattr(progress_buffer, '_flush_batch', failing_batch)
+    with pytest.raises(RuntimeError):
+        flush_progress()
+    assert FLUSHING_KEY in client.hashes
+    # heartbeats arriving meanwhile wait in the fresh buffer for the next flush
+    client.buffer(user_id, second, 70)
+    monkeypatch.setattr(progress_buffer, '_flush_batch', flush_batch)
+    assert flush_progress() == 1
+    assert stored_progress(db, user_id) == {first: (50, False)}
+    assert flush_progress() == 1
+    assert stored_progress(db, user_id) == {first: (50, False), second: (70, False)}
@@ -0,0 +1,152 @@
+import threading
+import time
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+import api.v1.celery_tasks
+from api.v1.course.quiz import regrade_quiz, start_attempt, submit_attempt
+from api.v1.models import (Answer, LinkQuizBlockQuestion, Question, QuestionTypeEnum, QuizAttempt, QuizBlock,
+                           QuizBlockTypeEnum)
+from db.routing import RoutingSession
+
+
+class FakeRegradeTask:
+    def __init__(self):
+        self.scheduled = []
+        self.error = None
+
+    def delay(self, quiz_block_id):
+        if self.error is not None:
+            raise self.error
+        self.scheduled.append(quiz_block_id)
+
+
+@pytest.fixture
+def regrade_task(monkeypatch):
+    task = FakeRegradeTask()
+    monkeypatch.setattr(api.v1.celery_tasks, 'regrade_quiz', task)
+    return task
+
+
+@pytest.fixture
+def quiz(db, make_course, make_user, regrade_task):
+    """ Quiz of two single choice questions, one error allowed -> (quiz_block_id, {question_id: [answer_id, ...]}),
+    the first answer of every question is the correct one """
+    _, _, (lesson_id,) = make_course([1])
+    author_id = make_user()
+    with Session(db) as session:
+        quiz_block = QuizBlock(quiz_type=QuizBlockTypeEnum.LAST_PUBLIC, course_lesson_id=lesson_id,
+                               created_by_id=author_id, allowed_errors_count=1)
+        questions = [Question(type=QuestionTypeEnum.SINGLE, answers=[
+            Answer(is_correct=True, sort=1), Answer(is_correct=False, sort=2)]) for _ in range(2)]
+        quiz_block.questions = questions
+        session.add(quiz_block)
+        session.commit()
+        regrade_task.scheduled.clear()
+        return quiz_block.id, {question.id: [answer.id for answer in question.answers] for question in questions}
+
+
+def test_running_attempt_is_returned(db, make_user, quiz):
+    quiz_block_id, _ = quiz
+    user_id = make_user()
+    with Session(db) as session:
+        first = start_attempt(session, user_id, quiz_block_id)
+        session.commit()
+        assert start_attempt(session, user_id, quiz_block_id).id == first.id
+        assert first.attempt_number == 1
+
+
+def test_concurrent_first_attempts_share_one_attempt(db, make_user, quiz):
+    quiz_block_id, _ = quiz
+    user_id = make_user()
+    replica = sa.create_engine(db.url, future=True)
+    replica_statements = []
+    sa.event.listen(replica, 'before_cursor_execute',
+                    lambda conn, cursor, statement, *args: replica_statements.append(statement))
+    results = {}
+
+    def start_concurrently():
+        with RoutingSession(bind=db, replicas=[replica]) as session:
+            results['second'] = start_attempt(session, user_id, quiz_block_id).id
+            session.commit()
+
+    try:
+        with Session(db) as session:
+            first = start_attempt(session, user_id, quiz_block_id)
+            thread = threading.Thread(target=start_concurrently)
+            thread.start()
+            time.sleep(0.5)
+            assert thread.is_alive(), 'the second insert must wait for the first transaction'
+            session.commit()
+            thread.join(timeout=10)
+            assert results['second'] == first.id
+    finally:
+        replica.dispose()
+    # plain reads went to the replica, the conflicting row is read on the primary as the replica may lag
+    assert [statement for statement in replica_statements if 'FROM quiz_block' in statement]
+    assert not [statement for statement in replica_statements if 'quiz_attempt' in statement]
+    with db.connect() as connection:
+        assert connection.execute(sa.select(sa.func.count(QuizAttempt.id))).scalar() == 1
+
+
+def test_pass_threshold_change_regrades(db, make_user, quiz, regrade_task):
+    quiz_block_id, answers = quiz
+    user_id = make_user()
+    with Session(db) as session:
+        attempt = start_attempt(session, user_id, quiz_block_id)
+        # both answers wrong, one error allowed
+        attempt = submit_attempt(session, user_id, attempt.id,
+                                 {question_id: [answer_ids[1]] for question_id, answer_ids in answers.items()})
+        session.commit()
+        assert not attempt.is_passed
+
+        session.get(QuizBlock, quiz_block_id).allowed_errors_count = 2
+        session.commit()
+    assert regrade_task.scheduled == [quiz_block_id]
+    with db.begin() as connection:
+        assert regrade_quiz(connection, quiz_block_id) == 1
+        assert connection.execute(sa.select(QuizAttempt.is_passed)).scalar() is True
+
+
+def test_changes_outside_the_answer_key_do_not_regrade(db, quiz, regrade_task):
+    quiz_block_id, answers = quiz
+    with Session(db) as session:
+        session.get(QuizBlock, quiz_block_id).sort = 2
+        session.get(Answer, next(iter(answers.values()))[1]).sort = 5
+        session.commit()
+    assert regrade_task.scheduled == []
+
+
+@pytest.mark.parametrize('target', ['question', 'answer'])
+def test_deletes_regrade(db, quiz, regrade_task, target):
+    quiz_block_id, answers = quiz
+    question_id, answer_ids = next(iter(answers.items()))
+    with Session(db) as session:
+        deleted = session.get(Question, question_id) if target == 'question' else session.get(Answer, answer_ids[0])
+        session.delete(deleted)
+        session.commit()
+    assert regrade_task.scheduled == [quiz_block_id]
+
+
+def test_unlinking_a_question_regrades(db, quiz, regrade_task):
+    quiz_block_id, answers = quiz
+    with Session(db) as session:
+        quiz_block = session.get(QuizBlock, quiz_block_id)
+        quiz_block.questions.remove(session.get(Question, next(iter(answers))))
+        session.commit()
+    assert regrade_task.scheduled == [quiz_block_id]
+    with db.connect() as connection:
+        assert connection.execute(sa.select(sa.func.count(LinkQuizBlockQuestion.id))).scalar() == 1
+
+
+def test_broker_outage_does_not_fail_the_commit(db, quiz, regrade_task):
+    quiz_block_id, _ = quiz
+    regrade_task.error = ConnectionError('broker is down')
+    with Session(db) as session:
+        session.get(QuizBlock, quiz_block_id).allowed_errors_count = 3
+        session.commit()
+    with db.connect() as connection:
+        stmt = sa.select(QuizBlock.allowed_errors_count).where(QuizBlock.id == quiz_block_id)
+        assert connection.execute(stmt).scalar() == 3
@@ -0,0 +1,97 @@
+import pytest
+import sqlalchemy as sa
+
+from db.routing import USE_PRIMARY, LeastLoadedBalancer, RoutingSession, WriteMarker, write_marker
+
+items = sa.table('item', sa.column('id'))
+
+
+@pytest.fixture
+def engines(tmp_path):
+    # file databases, QueuePool like the real engines (see db/pool.py)
+    primary, *replicas = [sa.create_engine(f'sqlite:///{tmp_path / name}.db', future=True, poolclass=sa.QueuePool)
+                          for name in ('primary', 'replica_0', 'replica_1')]
+    for engine in (primary, *replicas):
+        with engine.begin() as connection:
+            connection.exec_driver_sql('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+    yield primary, replicas
+    for engine in (primary, *replicas):
+        engine.dispose()
+
+
+@pytest.fixture
+def session(engines):
+    primary, replicas = engines
+    with RoutingSession(bind=primary, replicas=replicas) as session:
+        yield session
+
+
+def test_reads_are_balanced_over_the_replicas(session, engines):
+    _, replicas = engines
+    assert [session.get_bind(clause=sa.select(items)) for _ in range(4)] == replicas * 2
+
+
+def test_locking_reads_and_writes_go_to_the_primary(session, engines):
+    primary, _ = engines
+    assert session.get_bind(clause=sa.select(items).with_for_update()) is primary
+    assert session.get_bind(clause=sa.insert(items)) is primary
+    assert session.get_bind() is primary
+
+
+def test_use_primary_keeps_reads_on_the_primary(session, engines):
+    primary, _ = engines
+    session.info[USE_PRIMARY] = True
+    assert session.get_bind(clause=sa.select(items)) is primary
+
+
+def test_reads_after_a_write_stay_on_the_primary_until_commit(session, engines):
+    primary, replicas = engines
+    session.execute(sa.insert(items).values(id=1))
+    assert session.get_bind(clause=sa.select(items)) is primary
+    # the uncommitted row is visible, a replica would not have it
+    assert session.execute(sa.select(items.c.id)).scalars().all() == [1]
+    session.commit()
+    assert session.get_bind(clause=sa.select(items)) in replicas
+
+
+def test_rollback_forgets_the_write(session, engines):
+    _, replicas = engines
+    session.execute(sa.insert(items).values(id=1))
+    session.rollback()
+    assert session.get_bind(clause=sa.select(items)) in replicas
+
+
+def test_read_your_writes_after_commit(session, engines):
+    primary, replicas = engines
+    marker = WriteMarker()
+    token = write_marker.set(marker)
+    try:
+        assert session.get_bind(clause=sa.select(items)) in replicas
+        session.execute(sa.insert(items).values(id=1))
+        session.commit()
+        assert marker.changed and marker.is_recent
+        # a later session of the same client still reads its write from the primary
+        with RoutingSession(bind=primary, replicas=replicas) as next_session:
+            assert next_session.get_bind(clause=sa.select(items)) is primary
+    finally:
+        write_marker.reset(token)
+
+
+def test_read_only_commit_does_not_mark_the_client(session):
+    marker = WriteMarker()
+    token = write_marker.set(marker)
+    try:
+        session.execute(sa.select(items))
+        session.commit()
+        assert not marker.changed
+    finally:
+        write_marker.reset(token)
+
+
+def test_least_loaded_balancer_picks_the_idle_replica(engines):
+    _, (busy, idle) = engines
+    connection = busy.connect()
+    try:
+        assert LeastLoadedBalancer.choose([busy, idle]) is idle
+    finally:
+        connection.close()
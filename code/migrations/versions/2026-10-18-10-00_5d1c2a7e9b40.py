@@ -0,0 +1,29 @@
+"""add keyset pagination indexes
+
+Revision ID: 5d1c2a7e9b40
+Revises: 161fb3b49a73
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d1c2a7e9b40'
+down_revision: Union[str, None] = '161fb3b49a73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_user_organization_id_id', 'user', ['organization_id', 'id'], unique=False)
+    op.create_index('ix_user_learned_course_lesson_user_id_id', 'user_learned_course_lesson', ['user_id', 'id'],
+                    unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_learned_course_lesson_user_id_id', table_name='user_learned_course_lesson')
+    op.drop_index('ix_user_organization_id_id', table_name='user')
@@ -0,0 +1,57 @@
+"""add course stats
+
+Revision ID: 8b3f6d0c2e17
+Revises: 5d1c2a7e9b40
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b3f6d0c2e17'
+down_revision: Union[str, None] = '5d1c2a7e9b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('course_stats',
+    sa.Column('course_id', sa.Integer(), nullable=False),
+    sa.Column('total_modules', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('total_lessons', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('total_homeworks', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('rating', sa.Float(), server_default='0', nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['course_id'], ['course.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('course_id')
+    )
+    # backfill, afterwards the rows are maintained on flush
+    op.execute("""
+        INSERT INTO course_stats (course_id, total_modules, total_lessons, total_homeworks, rating_count, rating,
+                                  created_at)
+        SELECT course.id,
+               (SELECT count(*) FROM course_module
+                WHERE course_module.course_id = course.id AND course_module.is_active),
+               (SELECT count(*) FROM course_module JOIN course_lesson ON course_module.id = course_lesson.course_module_id
+                WHERE course_module.course_id = course.id AND course_lesson.is_active),
+               (SELECT count(*) FROM course_module JOIN course_lesson ON course_module.id = course_lesson.course_module_id
+                WHERE course_module.course_id = course.id AND course_lesson.is_active AND course_lesson.is_homework),
+               (SELECT count(*) FROM course_rating WHERE course_rating.course_id = course.id),
+               (SELECT coalesce(avg(course_rating.rating), 0) FROM course_rating
+                WHERE course_rating.course_id = course.id),
+               timezone('utc', now())
+        FROM course
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('course_stats')
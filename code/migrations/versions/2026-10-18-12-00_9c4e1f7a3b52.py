@@ -0,0 +1,77 @@
+"""add course catalogue materialized view
+
+Revision ID: 9c4e1f7a3b52
+Revises: 8b3f6d0c2e17
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4e1f7a3b52'
+down_revision: Union[str, None] = '8b3f6d0c2e17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # one row per course translation, see api/v1/models/catalogue_model.py
+    op.execute("""
+        CREATE MATERIALIZED VIEW course_catalogue AS
+        SELECT course.id AS course_id,
+               course_translation.language_id,
+               language.code AS language_code,
+               course.slug,
+               course_translation.title,
+               course_translation.sub_title,
+               course.price,
+               CASE WHEN discount.is_active AND NOT coalesce(discount.is_archive, false)
+                    THEN round(course.price * (100 - discount.percent::numeric) / 100, 2)
+                    ELSE course.price
+               END AS final_price,
+               course.is_free,
+               course.level,
+               course.status,
+               course.is_active,
+               course.is_verified,
+               course.is_for_child,
+               course.organization_id,
+               course.sort,
+               course.banner_image_id,
+               media.path AS banner_image_path,
+               ARRAY(SELECT link_category_course.category_id FROM link_category_course
+                     WHERE link_category_course.course_id = course.id
+                     ORDER BY link_category_course.category_id) AS category_ids,
+               ARRAY(SELECT link_course_tag.tag_id FROM link_course_tag
+                     WHERE link_course_tag.course_id = course.id
+                     ORDER BY link_course_tag.tag_id) AS tag_ids,
+               coalesce(course_stats.total_modules, 0) AS total_modules,
+               coalesce(course_stats.total_lessons, 0) AS total_lessons,
+               coalesce(course_stats.total_homeworks, 0) AS total_homeworks,
+               coalesce(course_stats.rating, 0) AS rating,
+               course.created_at
+        FROM course
+        JOIN course_translation ON course_translation.course_id = course.id
+        JOIN language ON language.id = course_translation.language_id
+        LEFT JOIN discount ON discount.id = course.discount_id
+        LEFT JOIN media ON media.id = course.banner_image_id
+        LEFT JOIN course_stats ON course_stats.course_id = course.id
+        WHERE course.deleted_at IS NULL
+    """)
+    # the unique index is required by REFRESH MATERIALIZED VIEW CONCURRENTLY
+    op.create_index('ix_course_catalogue_course_id_language_id', 'course_catalogue', ['course_id', 'language_id'],
+                    unique=True)
+    op.create_index('ix_course_catalogue_language_code_status_course_id', 'course_catalogue',
+                    ['language_code', 'status', 'course_id'], unique=False)
+    op.create_index('ix_course_catalogue_category_ids', 'course_catalogue', ['category_ids'], unique=False,
+                    postgresql_using='gin')
+    op.create_index('ix_course_catalogue_tag_ids', 'course_catalogue', ['tag_ids'], unique=False,
+                    postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS course_catalogue")
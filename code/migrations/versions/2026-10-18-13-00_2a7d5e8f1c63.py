@@ -0,0 +1,60 @@
+"""add full text search to course translations
+
+Revision ID: 2a7d5e8f1c63
+Revises: 9c4e1f7a3b52
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '2a7d5e8f1c63'
+down_revision: Union[str, None] = '9c4e1f7a3b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+tables = ['course_translation', 'course_module_translation', 'course_lesson_translation']
+
+
+def upgrade() -> None:
+    # configuration by language code, keep in sync with SEARCH_CONFIGS in api/v1/course/search.py;
+    # sub_title and content exist on some of the tables only, hence to_jsonb(NEW)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION translation_search_vector_update() RETURNS trigger AS $$
+        DECLARE
+            config regconfig;
+        BEGIN
+            SELECT CASE language.code WHEN 'ru' THEN 'russian' WHEN 'en' THEN 'english' ELSE 'simple' END::regconfig
+            INTO config FROM language WHERE language.id = NEW.language_id;
+            config := coalesce(config, 'simple'::regconfig);
+            NEW.search_vector :=
+                setweight(to_tsvector(config, coalesce(NEW.title, '')), 'A') ||
+                setweight(to_tsvector(config, coalesce(to_jsonb(NEW) ->> 'sub_title', '')), 'B') ||
+                setweight(to_tsvector(config, coalesce(NEW."desc", '')), 'B') ||
+                setweight(to_tsvector(config, coalesce(to_jsonb(NEW) ->> 'content', '')), 'C');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table in tables:
+        op.add_column(table, sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+        op.execute(f"""
+            CREATE TRIGGER {table}_search_vector_update BEFORE INSERT OR UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION translation_search_vector_update()
+        """)
+        op.execute(f"UPDATE {table} SET title = title")
+        op.create_index(f'ix_{table}_search_vector', table, ['search_vector'], unique=False, postgresql_using='gin')
+        op.drop_index(f'ix_{table}_desc', table_name=table)
+
+
+def downgrade() -> None:
+    for table in tables:
+        op.create_index(f'ix_{table}_desc', table, ['desc'], unique=False)
+        op.drop_index(f'ix_{table}_search_vector', table_name=table)
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_search_vector_update ON {table}")
+        op.drop_column(table, 'search_vector')
+    op.execute("DROP FUNCTION IF EXISTS translation_search_vector_update()")
@@ -0,0 +1,36 @@
+"""add trigram indexes for user search
+
+Revision ID: 6f1b9d3e4a28
+Revises: 2a7d5e8f1c63
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f1b9d3e4a28'
+down_revision: Union[str, None] = '2a7d5e8f1c63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index('ix_user_email_trgm', 'user', ['email'], unique=False, postgresql_using='gin',
+                    postgresql_ops={'email': 'gin_trgm_ops'})
+    op.create_index('ix_user_phone_trgm', 'user', ['phone'], unique=False, postgresql_using='gin',
+                    postgresql_ops={'phone': 'gin_trgm_ops'})
+    for column in ['first_name', 'last_name', 'short_name']:
+        op.create_index(f'ix_user_translation_{column}_trgm', 'user_translation', [column], unique=False,
+                        postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    for column in ['first_name', 'last_name', 'short_name']:
+        op.drop_index(f'ix_user_translation_{column}_trgm', table_name='user_translation')
+    op.drop_index('ix_user_phone_trgm', table_name='user')
+    op.drop_index('ix_user_email_trgm', table_name='user')
@@ -0,0 +1,110 @@
+"""add lesson ordinals and user course progress bitmaps
+
+Revision ID: 3e8a6c1f9d24
+Revises: 6f1b9d3e4a28
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e8a6c1f9d24'
+down_revision: Union[str, None] = '6f1b9d3e4a28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('course_lesson', sa.Column('ordinal', sa.Integer(), nullable=True))
+    op.execute("""
+        UPDATE course_lesson SET ordinal = numbered.ordinal
+        FROM (
+            SELECT course_lesson.id,
+                   row_number() OVER (PARTITION BY course_module.course_id
+                                      ORDER BY course_module.sort, course_module.id,
+                                               course_lesson.sort, course_lesson.id) - 1 AS ordinal
+            FROM course_lesson JOIN course_module ON course_module.id = course_lesson.course_module_id
+        ) AS numbered
+        WHERE numbered.id = course_lesson.id
+    """)
+
+    # bitwise OR of two bitmaps of any length
+    op.execute("""
+        CREATE FUNCTION progress_bitmap_or(a bytea, b bytea) RETURNS bytea AS $$
+        DECLARE
+            result bytea := CASE WHEN length(a) >= length(b) THEN a ELSE b END;
+            other bytea := CASE WHEN length(a) >= length(b) THEN b ELSE a END;
+        BEGIN
+            FOR i IN 0 .. length(other) - 1 LOOP
+                result := set_byte(result, i, get_byte(result, i) | get_byte(other, i));
+            END LOOP;
+            RETURN result;
+        END
+        $$ LANGUAGE plpgsql IMMUTABLE STRICT
+    """)
+    # element-wise greatest, the shorter array is padded with NULLs
+    op.execute("""
+        CREATE FUNCTION progress_percents_max(a smallint[], b smallint[]) RETURNS smallint[] AS $$
+            SELECT coalesce(array_agg(greatest(x, y) ORDER BY n), '{}')
+            FROM unnest(a, b) WITH ORDINALITY AS t(x, y, n)
+        $$ LANGUAGE sql IMMUTABLE STRICT
+    """)
+
+    op.create_table('user_course_progress',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('course_id', sa.Integer(), nullable=False),
+    sa.Column('learned', sa.LargeBinary(), server_default=sa.text("''::bytea"), nullable=False),
+    sa.Column('percents', postgresql.ARRAY(sa.SmallInteger()), server_default=sa.text("'{}'"), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['course_id'], ['course.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'course_id')
+    )
+    # backfill from user_learned_course_lesson: bit n is bit n % 8 of byte n / 8, as get_bit/set_bit
+    op.execute("""
+        WITH lessons AS (
+            SELECT learned.user_id, course_module.course_id, course_lesson.ordinal,
+                   learned.learned_percent, learned.is_learned
+            FROM user_learned_course_lesson AS learned
+            JOIN course_lesson ON course_lesson.id = learned.course_lesson_id
+            JOIN course_module ON course_module.id = course_lesson.course_module_id
+        ), slots AS (
+            SELECT ranges.user_id, ranges.course_id, slot.ordinal, lessons.learned_percent, lessons.is_learned
+            FROM (SELECT user_id, course_id, max(ordinal) AS max_ordinal FROM lessons GROUP BY user_id, course_id)
+                AS ranges
+            CROSS JOIN LATERAL generate_series(0, ranges.max_ordinal) AS slot(ordinal)
+            LEFT JOIN lessons ON lessons.user_id = ranges.user_id AND lessons.course_id = ranges.course_id
+                             AND lessons.ordinal = slot.ordinal
+        ), bytes AS (
+            SELECT user_id, course_id, ordinal / 8 AS byte_index,
+                   sum(CASE WHEN is_learned THEN 1 << (ordinal % 8) ELSE 0 END) AS value
+            FROM slots GROUP BY user_id, course_id, ordinal / 8
+        ), bitmaps AS (
+            SELECT user_id, course_id,
+                   decode(string_agg(lpad(to_hex(value), 2, '0'), '' ORDER BY byte_index), 'hex') AS learned
+            FROM bytes GROUP BY user_id, course_id
+        ), percents AS (
+            SELECT user_id, course_id,
+                   array_agg(round(learned_percent)::smallint ORDER BY ordinal) AS percents
+            FROM slots GROUP BY user_id, course_id
+        )
+        INSERT INTO user_course_progress (user_id, course_id, learned, percents, created_at)
+        SELECT bitmaps.user_id, bitmaps.course_id, bitmaps.learned, percents.percents, timezone('utc', now())
+        FROM bitmaps JOIN percents ON percents.user_id = bitmaps.user_id AND percents.course_id = bitmaps.course_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('user_course_progress')
+    op.execute("DROP FUNCTION progress_percents_max(smallint[], smallint[])")
+    op.execute("DROP FUNCTION progress_bitmap_or(bytea, bytea)")
+    op.drop_column('course_lesson', 'ordinal')
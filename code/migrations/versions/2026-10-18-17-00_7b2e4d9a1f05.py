@@ -0,0 +1,49 @@
+"""add quiz attempts
+
+Revision ID: 7b2e4d9a1f05
+Revises: 3e8a6c1f9d24
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2e4d9a1f05'
+down_revision: Union[str, None] = '3e8a6c1f9d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('quiz_attempt',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('quiz_block_id', sa.Integer(), nullable=False),
+    sa.Column('attempt_number', sa.Integer(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('submitted_at', sa.DateTime(), nullable=True),
+    sa.Column('answers', postgresql.JSONB(astext_type=sa.Text()), server_default=sa.text("'{}'::jsonb"),
+              nullable=False),
+    sa.Column('correct_count', sa.Integer(), nullable=True),
+    sa.Column('errors_count', sa.Integer(), nullable=True),
+    sa.Column('is_passed', sa.Boolean(), nullable=True),
+    sa.Column('graded_at', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['quiz_block_id'], ['quiz_block.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'quiz_block_id', 'attempt_number')
+    )
+    op.create_index('ix_quiz_attempt_quiz_block_id_id', 'quiz_attempt', ['quiz_block_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_quiz_attempt_quiz_block_id_id', table_name='quiz_attempt')
+    op.drop_table('quiz_attempt')
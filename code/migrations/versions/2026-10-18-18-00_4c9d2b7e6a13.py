@@ -0,0 +1,26 @@
+"""add lower(email) index for case insensitive user lookups
+
+Revision ID: 4c9d2b7e6a13
+Revises: 7b2e4d9a1f05
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c9d2b7e6a13'
+down_revision: Union[str, None] = '7b2e4d9a1f05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_user_email_lower', 'user', [sa.text('lower(email)')], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_email_lower', table_name='user')